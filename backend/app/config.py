@@ -1,8 +1,22 @@
 """
 LogicForge Backend Configuration
 """
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
-from functools import lru_cache
+from functools import cached_property, lru_cache
+
+
+def normalize_pg_url(url: str) -> str:
+    """Rewrite postgres:// style URLs to the asyncpg dialect.
+
+    Uses str.removeprefix (O(prefix), no full-string scan/replace) since
+    this runs for every URL passing through settings or engine creation.
+    """
+    if url:
+        for prefix in ("postgres://", "postgresql://"):
+            if (rest := url.removeprefix(prefix)) != url:
+                return "postgresql+asyncpg://" + rest
+    return url
 
 
 class Settings(BaseSettings):
@@ -15,24 +29,31 @@ class Settings(BaseSettings):
     openai_api_key: str | None = None
     google_api_key: str | None = None
     groq_api_key: str | None = None
+    # Cap on in-flight LLM calls when fanning out (provider rate limits)
+    llm_max_concurrent: int = 8
+    # Preemptive per-minute budgets checked before each LLM call
+    llm_requests_per_minute: int = 60
+    llm_tokens_per_minute: int = 100_000
+    # Per-query HNSW candidate-list size (recall vs latency knob for
+    # semantic search); Postgres's own default is 40
+    hnsw_ef_search: int = 100
     
     # App Config
     app_env: str = "development"
     cors_origins: str = "http://localhost:3000"
+    # Echo every rendered SQL statement — keep False outside local debugging,
+    # it adds per-statement logging to the query hot path
+    sql_echo: bool = False
     
-    @property
+    @cached_property
     def cors_origins_list(self) -> list[str]:
         return [origin.strip() for origin in self.cors_origins.split(",")]
     
-    from pydantic import field_validator
-
     @field_validator("database_url", mode="before")
     @classmethod
     def fix_database_url(cls, v: str) -> str:
         """Fix database URL for Render and SQLAlchemy compatibility."""
-        if v and v.startswith("postgres://"):
-            return v.replace("postgres://", "postgresql+asyncpg://", 1)
-        return v
+        return normalize_pg_url(v)
 
     
     class Config:
@@ -2,60 +2,96 @@
 LogicForge Backend - FastAPI Application
 A gamified, AI-assisted programme design tool for Education NGOs
 """
+import logging
+import logging.handlers
+import queue
+import re
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.config import get_settings
-from app.routers import programs_router, ai_router, export_router, gamification_router, benchmarks_router, activities_router, forms_router, templates_router, collaboration_router, analytics_router
-from app.database import init_db
+from app.database import warmup_db
 
 settings = get_settings()
 
+# Routers are imported lazily in lifespan — each module pulls in heavy
+# dependencies (AI SDKs, reportlab, ORM models), and deferring them lets
+# /health answer before that warm-up cost is paid.
+ROUTER_NAMES = (
+    "programs_router", "ai_router", "export_router",
+    "gamification_router", "benchmarks_router", "activities_router",
+    "forms_router", "templates_router", "collaboration_router", "analytics_router",
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
-    # Startup
-    print("🚀 LogicForge Backend starting...")
-    print(f"✅ Loaded CORS Origins: {settings.cors_origins_list}")
-    await init_db()
-    print("✅ Database initialized")
+    # Startup: route all log records through a queue so slow stdout
+    # (Docker/journald) never blocks the event loop.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+
+    if not getattr(app.state, "routers_loaded", False):
+        from app import routers
+        for name in ROUTER_NAMES:
+            app.include_router(getattr(routers, name))
+        app.state.routers_loaded = True
+    await warmup_db()
+    # Warm the pgvector index/heap pages so the first semantic search
+    # doesn't pay cold reads (no-op where pg_prewarm is unavailable)
+    from app.database import get_session_factory
+    from app.services.rag_service import get_rag_service
+    async with get_session_factory()() as db:
+        await get_rag_service().prewarm(db)
+    # One structured record instead of a print per startup phase
+    logger.info(
+        "🚀 LogicForge Backend started",
+        extra={"cors_origins": settings.cors_origins_list, "db": "warmed", "routers": len(ROUTER_NAMES)},
+    )
     yield
     # Shutdown
-    print("👋 LogicForge Backend shutting down...")
+    logger.info("👋 LogicForge Backend shutting down...")
+    # Drain the shared AI HTTP pool so keepalive connections close cleanly
+    from app.services.ai_service import ai_service
+    if ai_service is not None:
+        await ai_service.aclose()
+    listener.stop()
+    root.handlers = handlers
 
 
 app = FastAPI(
     title="LogicForge API",
     description="AI-assisted programme design tool for Education NGOs",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware - Allow configured origins + all Vercel preview deployments
+# CORS middleware - Allow configured origins + all Vercel preview deployments.
+# Everything is folded into one compiled regex so each preflight does a
+# single C-level match instead of scanning the origins list.
+cors_origin_regex = "^(" + "|".join(
+    [re.escape(origin) for origin in settings.cors_origins_list]
+    + [r"https://.*\.vercel\.app"]
+) + ")$"
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.cors_origins_list,
-    allow_origin_regex=r"https://.*\.vercel\.app",  # Allow all Vercel preview deployments
+    allow_origin_regex=cors_origin_regex,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Include routers
-app.include_router(programs_router)
-app.include_router(ai_router)
-app.include_router(export_router)
-app.include_router(gamification_router)
-app.include_router(benchmarks_router)
-app.include_router(activities_router)
-app.include_router(forms_router)
-app.include_router(templates_router)
-app.include_router(collaboration_router)
-app.include_router(analytics_router)
-
-
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -5,12 +5,14 @@ from datetime import datetime
 from typing import Optional
 from uuid import uuid4
 from sqlalchemy import (
-    Column, String, Text, Integer, Boolean, DateTime, 
-    ForeignKey, CheckConstraint, ARRAY, JSON
+    Column, Computed, String, Text, Integer, Boolean, Date, DateTime,
+    ForeignKey, CheckConstraint, Index
 )
-from sqlalchemy.dialects.postgresql import UUID
+# Dialect-specific ARRAY for @> containment support (this app is
+# Postgres-only)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR, UUID
 from sqlalchemy.orm import relationship
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC
 from app.database import Base
 
 
@@ -43,6 +45,12 @@ class Program(Base):
     __table_args__ = (
         CheckConstraint("status IN ('draft', 'in_progress', 'completed')"),
         CheckConstraint("current_step BETWEEN 1 AND 5"),
+        # Analytics filters on user_id and ranges/groups on created_at
+        Index("ix_programs_user_created", user_id, created_at),
+        # list_programs filters by user or status and orders by updated_at
+        # DESC — these let the sort come straight off the index
+        Index("ix_programs_user_updated", user_id, updated_at.desc()),
+        Index("ix_programs_status_updated", status, updated_at.desc()),
     )
     
     user = relationship("User", back_populates="programs")
@@ -60,7 +68,9 @@ class ProblemStatement(Base):
     program_id = Column(UUID(as_uuid=True), ForeignKey("programs.id", ondelete="CASCADE"), unique=True)
     challenge_text = Column(Text, nullable=False)
     refined_text = Column(Text)
-    root_causes = Column(JSON, default=list)
+    # JSONB (not JSON) so Postgres stores the parsed binary form instead of
+    # re-parsing text per read, and can GIN-index it if ever filtered on
+    root_causes = Column(JSONB, default=list)
     theme = Column(String(100))
     is_completed = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
@@ -88,8 +98,10 @@ class Stakeholder(Base):
     
     __table_args__ = (
         CheckConstraint("priority IN ('high', 'medium', 'low')"),
+        # Supports the analytics JOIN on program_id
+        Index("ix_stakeholders_program", program_id),
     )
-    
+
     program = relationship("Program", back_populates="stakeholders")
 
 
@@ -104,9 +116,46 @@ class ProvenModel(Base):
     themes = Column(ARRAY(Text), default=list)
     target_outcomes = Column(ARRAY(Text), default=list)
     source_url = Column(String(500))
-    embedding = Column(Vector(1536))  # OpenAI embedding dimension
+    # OpenAI embedding dimension; halfvec (fp16) halves the bytes read per
+    # probed row versus vector (fp32) with negligible recall loss
+    embedding = Column(HALFVEC(1536))
+    # Generated search document for the keyword fallback: name outranks
+    # description outranks outcomes. outcomes_text is an immutable wrapper
+    # around array_to_string created by scripts/seed.py (generated columns
+    # reject the stable builtin directly)
+    search_doc = Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('english', outcomes_text(target_outcomes)), 'C')",
+            persisted=True,
+        ),
+    )
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
+    __table_args__ = (
+        # HNSW index so semantic search walks the graph instead of
+        # sequentially scanning every embedding (defaults m=16 /
+        # ef_construction=64 are fine at this dataset size). Embeddings
+        # are stored unit-norm, so inner-product ops rank identically to
+        # cosine without the per-comparison norm computation
+        Index(
+            "ix_proven_models_embedding_hnsw_ip",
+            embedding,
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "halfvec_ip_ops"},
+        ),
+        # GIN indexes let theme/outcome pre-filters (themes @> ARRAY[...])
+        # narrow the candidate set before the vector rescore instead of
+        # seq-scanning every 3 KB embedding row
+        Index("ix_proven_models_themes_gin", themes, postgresql_using="gin"),
+        Index("ix_proven_models_outcomes_gin", target_outcomes, postgresql_using="gin"),
+        # One GIN over the weighted tsvector serves the whole keyword
+        # fallback (replaces the per-column trigram indexes)
+        Index("ix_proven_models_search_gin", search_doc, postgresql_using="gin"),
+    )
+
 
 class ProgramProvenModel(Base):
     __tablename__ = "program_proven_models"
@@ -116,7 +165,12 @@ class ProgramProvenModel(Base):
     proven_model_id = Column(UUID(as_uuid=True), ForeignKey("proven_models.id", ondelete="CASCADE"))
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
-    
+
+    __table_args__ = (
+        # Per-program model lookups in the full-program and export loaders
+        Index("ix_program_proven_models_program", program_id),
+    )
+
     program = relationship("Program", back_populates="proven_models")
     proven_model = relationship("ProvenModel")
 
@@ -131,7 +185,12 @@ class Outcome(Base):
     timeframe = Column(String(100))
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
-    
+
+    __table_args__ = (
+        # Per-program outcome listings
+        Index("ix_outcomes_program", program_id),
+    )
+
     program = relationship("Program", back_populates="outcomes")
     indicators = relationship("Indicator", back_populates="outcome", cascade="all, delete-orphan")
 
@@ -154,11 +213,60 @@ class Indicator(Base):
     
     __table_args__ = (
         CheckConstraint("type IN ('outcome', 'output')"),
+        # Per-outcome indicator listings and the selectin batch loads
+        Index("ix_indicators_outcome", outcome_id),
     )
     
     outcome = relationship("Outcome", back_populates="indicators")
 
 
+class RefineCache(Base):
+    """Semantic cache for refine_problem responses.
+
+    Near-duplicate challenge texts (same problem, different wording) hit a
+    cosine-similarity lookup here instead of a fresh LLM round-trip.
+    """
+    __tablename__ = "refine_cache"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    embedding = Column(HALFVEC(1536), nullable=False)
+    response = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_refine_cache_embedding_hnsw",
+            embedding,
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "halfvec_cosine_ops"},
+        ),
+    )
+
+
+class Activity(Base):
+    __tablename__ = "activities"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    program_id = Column(UUID(as_uuid=True), ForeignKey("programs.id", ondelete="CASCADE"))
+    outcome_id = Column(UUID(as_uuid=True), ForeignKey("outcomes.id", ondelete="SET NULL"), nullable=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    status = Column(String(50), default="planned")
+    responsible_person = Column(String(255))
+    resources_needed = Column(Text)
+    progress_percentage = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        CheckConstraint("status IN ('planned', 'in_progress', 'completed', 'delayed')"),
+        # Covers both per-program listing and date-ordered Gantt reads
+        Index("ix_activities_program_start", program_id, start_date),
+    )
+
+
 class GeneratedDocument(Base):
     __tablename__ = "generated_documents"
     
@@ -0,0 +1,30 @@
+"""
+Shared precompiled queries used by more than one router.
+"""
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import defer, joinedload, raiseload, selectinload
+
+from app.models import Program, Outcome, ProgramProvenModel, ProvenModel
+
+# Full-program eager-load spec, built once at import; handlers pass only
+# the bind value, skipping per-request Select construction. One execute
+# fans out into selectin batches for every relationship instead of six
+# sequential awaits per request.
+# selectinload over an Outcome LEFT JOIN Indicator: one extra round-trip,
+# but no parent-row duplication when outcomes carry many indicators, and
+# rows arrive pre-grouped. A join would only win for near-empty programs,
+# where both plans are cheap anyway.
+# The 3 KB embedding column is deferred, and the chained raiseload("*")
+# wildcards make any stray lazy access on the child entities raise too —
+# the top-level wildcard only guards Program itself.
+STMT_FULL_PROGRAM = select(Program).where(Program.id == bindparam("pid")).options(
+    selectinload(Program.problem_statement).raiseload("*"),
+    selectinload(Program.stakeholders).raiseload("*"),
+    selectinload(Program.outcomes).raiseload("*"),
+    selectinload(Program.outcomes).selectinload(Outcome.indicators).raiseload("*"),
+    selectinload(Program.proven_models).raiseload("*"),
+    selectinload(Program.proven_models)
+    .joinedload(ProgramProvenModel.proven_model)
+    .defer(ProvenModel.embedding),
+    raiseload("*"),
+)
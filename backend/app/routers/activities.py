@@ -5,13 +5,15 @@ from typing import List, Optional
 from uuid import UUID
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 
 from app.database import get_db
+from app.models import Activity
 
-router = APIRouter(prefix="/api/activities", tags=["activities"])
+router = APIRouter(prefix="/api/activities", default_response_class=ORJSONResponse, tags=["activities"])
 
 
 # Pydantic schemas
@@ -50,93 +52,84 @@ class ActivityResponse(BaseModel):
     responsible_person: Optional[str] = None
     resources_needed: Optional[str] = None
     progress_percentage: int = 0
-    
+
     class Config:
         from_attributes = True
 
 
-# In-memory storage (would be database in production)
-# Using simple dict for now since we need to add Activity model to database
-activities_store: dict = {}
-
-
 @router.post("/", response_model=ActivityResponse, status_code=status.HTTP_201_CREATED)
-async def create_activity(activity_data: ActivityCreate):
+async def create_activity(activity_data: ActivityCreate, db: AsyncSession = Depends(get_db)):
     """Create a new activity."""
-    import uuid
-    activity_id = uuid.uuid4()
-    
-    activity = {
-        "id": activity_id,
-        "program_id": activity_data.program_id,
-        "outcome_id": activity_data.outcome_id,
-        "title": activity_data.title,
-        "description": activity_data.description,
-        "start_date": activity_data.start_date,
-        "end_date": activity_data.end_date,
-        "status": activity_data.status,
-        "responsible_person": activity_data.responsible_person,
-        "resources_needed": activity_data.resources_needed,
-        "progress_percentage": 0,
-    }
-    
-    activities_store[str(activity_id)] = activity
+    activity = Activity(**activity_data.model_dump())
+    db.add(activity)
+    await db.commit()
     return activity
 
 
 @router.get("/program/{program_id}", response_model=List[ActivityResponse])
-async def list_program_activities(program_id: UUID):
+async def list_program_activities(program_id: UUID, db: AsyncSession = Depends(get_db)):
     """List all activities for a program."""
-    return [a for a in activities_store.values() if str(a["program_id"]) == str(program_id)]
+    stmt = select(Activity).where(Activity.program_id == program_id)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
 
 
 @router.get("/{activity_id}", response_model=ActivityResponse)
-async def get_activity(activity_id: UUID):
+async def get_activity(activity_id: UUID, db: AsyncSession = Depends(get_db)):
     """Get a specific activity."""
-    activity = activities_store.get(str(activity_id))
+    activity = await db.get(Activity, activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     return activity
 
 
 @router.patch("/{activity_id}", response_model=ActivityResponse)
-async def update_activity(activity_id: UUID, update_data: ActivityUpdate):
+async def update_activity(activity_id: UUID, update_data: ActivityUpdate, db: AsyncSession = Depends(get_db)):
     """Update an activity."""
-    activity = activities_store.get(str(activity_id))
+    activity = await db.get(Activity, activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
-    
+
     for field, value in update_data.model_dump(exclude_unset=True).items():
-        activity[field] = value
-    
-    activities_store[str(activity_id)] = activity
+        setattr(activity, field, value)
+
+    await db.commit()
     return activity
 
 
 @router.delete("/{activity_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_activity(activity_id: UUID):
+async def delete_activity(activity_id: UUID, db: AsyncSession = Depends(get_db)):
     """Delete an activity."""
-    if str(activity_id) not in activities_store:
+    activity = await db.get(Activity, activity_id)
+    if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
-    del activities_store[str(activity_id)]
+    await db.delete(activity)
+    await db.commit()
 
 
 @router.get("/timeline/{program_id}")
-async def get_program_timeline(program_id: UUID):
+async def get_program_timeline(program_id: UUID, db: AsyncSession = Depends(get_db)):
     """Get activities formatted for Gantt chart display."""
-    program_activities = [a for a in activities_store.values() if str(a["program_id"]) == str(program_id)]
-    
+    # Column-only select: skips full ORM object hydration for a read-only
+    # view, and orjson encodes UUID/date natively — no manual formatting
+    stmt = select(
+        Activity.id, Activity.title, Activity.start_date,
+        Activity.end_date, Activity.progress_percentage, Activity.status
+    ).where(
+        Activity.program_id == program_id
+    ).order_by(Activity.start_date)
+    result = await db.execute(stmt)
+
     # Format for Gantt chart
-    timeline_data = []
-    for activity in program_activities:
-        timeline_data.append({
-            "id": str(activity["id"]),
-            "name": activity["title"],
-            "start": activity["start_date"].isoformat() if isinstance(activity["start_date"], date) else activity["start_date"],
-            "end": activity["end_date"].isoformat() if isinstance(activity["end_date"], date) else activity["end_date"],
-            "progress": activity["progress_percentage"],
-            "status": activity["status"],
+    return [
+        {
+            "id": row.id,
+            "name": row.title,
+            "start": row.start_date,
+            "end": row.end_date,
+            "progress": row.progress_percentage,
+            "status": row.status,
             "dependencies": [],  # Would link to other activities
-        })
-    
-    return timeline_data
+        }
+        for row in result
+    ]
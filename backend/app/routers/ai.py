@@ -1,10 +1,16 @@
 """
 AI Router - Endpoints for AI-powered features
 """
+from datetime import datetime, timedelta
+
+import orjson
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.models import RefineCache
 from app.services.ai_service import get_ai_service, AIService
 from app.services.rag_service import get_rag_service, RAGService
 from app.schemas import (
@@ -16,20 +22,68 @@ from app.schemas import (
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
+# Cosine similarity above this counts as "same question, different
+# wording" — the stored response is served without an LLM call
+_SEMANTIC_CACHE_THRESHOLD = 0.92
+_SEMANTIC_CACHE_TTL = timedelta(hours=24)
+
 
 @router.post("/refine-problem", response_model=RefineProblemResponse)
-async def refine_problem(request: RefineProblemRequest):
+async def refine_problem(
+    request: RefineProblemRequest,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Refine a vague challenge statement into a structured Root Cause Analysis.
-    
+
     This endpoint takes a raw challenge description and uses AI to:
     1. Clarify the core problem
     2. Identify root causes
     3. Suggest an appropriate theme (FLN, Career Readiness, etc.)
+
+    Near-duplicate challenge texts are served from a pgvector semantic
+    cache instead of a fresh LLM round-trip.
     """
     try:
         ai_service = get_ai_service()
+
+        vec = None
+        if ai_service.openai_client:
+            try:
+                vec = await ai_service.get_embedding(request.challenge_text)
+            except Exception:
+                vec = None  # cache is best-effort; fall through to the LLM
+
+        cutoff = datetime.utcnow() - _SEMANTIC_CACHE_TTL
+        if vec is not None:
+            # Best-effort like the embedding above: a broken cache (e.g.
+            # refine_cache table missing on a DB that hasn't re-run seed)
+            # degrades to a normal LLM round-trip, not a 500
+            try:
+                distance = RefineCache.embedding.cosine_distance(vec)
+                cached = await db.scalar(
+                    select(RefineCache.response)
+                    .where(distance < 1 - _SEMANTIC_CACHE_THRESHOLD,
+                           RefineCache.created_at > cutoff)
+                    .order_by(distance)
+                    .limit(1)
+                )
+                if cached is not None:
+                    return RefineProblemResponse.model_construct(**cached)
+            except Exception:
+                await db.rollback()  # clear the aborted transaction
+                vec = None  # skip the write too
+
         result = await ai_service.refine_problem(request.challenge_text)
+
+        # Don't poison the cache with the quota-exceeded demo payload
+        if vec is not None and not result.refined_text.startswith("[DEMO MODE]"):
+            try:
+                db.add(RefineCache(embedding=vec, response=result.model_dump()))
+                await db.execute(delete(RefineCache).where(RefineCache.created_at < cutoff))
+                await db.commit()
+            except Exception:
+                await db.rollback()  # the LLM result still gets served
         return result
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
@@ -37,6 +91,29 @@ async def refine_problem(request: RefineProblemRequest):
         raise HTTPException(status_code=500, detail=f"AI processing error: {str(e)}")
 
 
+@router.post("/refine-problem/stream")
+async def refine_problem_stream(request: RefineProblemRequest):
+    """
+    Stream the problem refinement as server-sent events.
+
+    Tokens are flushed to the client as the provider produces them, so
+    the UI can render progress after ~200ms instead of spinning for the
+    full generation. Each event carries a JSON-encoded text delta; the
+    stream ends with a [DONE] sentinel.
+    """
+    try:
+        ai_service = get_ai_service()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def event_stream():
+        async for delta in ai_service.refine_problem_stream(request.challenge_text):
+            yield b"data: " + orjson.dumps(delta) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @router.post("/suggest-stakeholders", response_model=SuggestStakeholdersResponse)
 async def suggest_stakeholders(request: SuggestStakeholdersRequest):
     """
@@ -1,18 +1,38 @@
 """
 Analytics Router - Provides aggregated analytics data for dashboards
 """
+import re
 from datetime import datetime, timedelta
 from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, func, text
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from app.database import get_db
 from app.models import Program, Stakeholder
 
-router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+router = APIRouter(prefix="/api/analytics", default_response_class=ORJSONResponse, tags=["analytics"])
+
+# Classify a stakeholder name in one C-level regex pass instead of five
+# sequential any(term in name) Python scans. lastgroup names the category.
+_CATEGORY_PATTERN = re.compile(
+    r"(?P<Teachers>teacher|principal|headmaster|faculty)"
+    r"|(?P<Parents>parent|caregiver|guardian|family)"
+    r"|(?P<Officials>officer|official|beo|crc|government|panchayat)"
+    r"|(?P<NGO_Partners>ngo|partner|organization|foundation)"
+    r"|(?P<Students>student|child|learner|youth)"
+)
+# Flat count-matrix coordinates: no per-row membership tests, just two
+# index lookups and an increment
+_CATEGORIES = ("Teachers", "Parents", "Officials", "NGO Partners", "Students")
+_CATEGORY_IDX = {
+    "Teachers": 0, "Parents": 1, "Officials": 2, "NGO_Partners": 3, "Students": 4,
+}
+_DEFAULT_CATEGORY_IDX = _CATEGORY_IDX["NGO_Partners"]
+_PRIO_IDX = {"high": 0, "medium": 1, "low": 2}
 
 
 # Response schemas
@@ -50,62 +70,66 @@ async def get_progress_timeline(
     # Calculate start date (N weeks ago)
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(weeks=weeks)
-    
-    # Get all programs for this user ordered by creation date
-    stmt = select(Program).where(
-        Program.user_id == user_id,
-        Program.created_at >= start_date
-    ).order_by(Program.created_at)
-    
-    result = await db.execute(stmt)
-    programs = list(result.scalars().all())
-    
-    # Get total programs before start date (for cumulative)
-    stmt_before = select(func.count()).select_from(Program).where(
-        Program.user_id == user_id,
-        Program.created_at < start_date
-    )
-    result_before = await db.execute(stmt_before)
-    programs_before = result_before.scalar() or 0
-    
-    # Generate weekly data points
+
+    # Aggregate AND accumulate in SQL: the window function returns at most
+    # `weeks` pre-summed rows, so Python never sees individual programs.
+    # The NULL-week row carries the cumulative baseline from programs
+    # created before the window (estimated at 200 XP each).
+    stmt = text("""
+        WITH weekly AS (
+            SELECT date_trunc('week', created_at) AS wk,
+                   COUNT(*) AS n,
+                   SUM(current_step * 50) AS xp
+            FROM programs
+            WHERE user_id = :u AND created_at >= :start
+            GROUP BY 1
+        ), prior AS (
+            SELECT COUNT(*) AS c
+            FROM programs
+            WHERE user_id = :u AND created_at < :start
+        )
+        SELECT wk,
+               SUM(n) OVER (ORDER BY wk) + (SELECT c FROM prior) AS cum_programs,
+               SUM(xp) OVER (ORDER BY wk) + (SELECT c * 200 FROM prior) AS cum_xp
+        FROM weekly
+        UNION ALL
+        SELECT NULL, c, c * 200 FROM prior
+        ORDER BY wk NULLS FIRST
+    """)
+    result = await db.execute(stmt, {"u": user_id, "start": start_date})
+
+    # Map each cumulative row onto its week offset from the window start
+    cumulative: dict[int, tuple[int, int]] = {}
+    baseline = (0, 0)
+    for week_start_dt, cum_programs, cum_xp in result.all():
+        if week_start_dt is None:
+            baseline = (cum_programs, cum_xp or 0)
+            continue
+        # Handle timezone-aware datetimes by making them naive
+        created = week_start_dt.replace(tzinfo=None) if week_start_dt.tzinfo else week_start_dt
+        week_num = (created - start_date).days // 7
+        cumulative[min(max(week_num, 0), weeks - 1)] = (cum_programs, cum_xp or 0)
+
+    # Generate weekly data points, carrying the last total across gaps
     data_points = []
-    current_date = start_date
-    cumulative_programs = programs_before
-    cumulative_xp = programs_before * 200  # Estimate 200 XP per program before
-    
+    running = baseline
+
     for week_num in range(weeks):
-        week_start = start_date + timedelta(weeks=week_num)
-        week_end = week_start + timedelta(weeks=1)
-        
-        # Count programs created this week (make timezone-naive for comparison)
-        week_programs = []
-        for p in programs:
-            # Handle timezone-aware datetimes by making them naive
-            created = p.created_at.replace(tzinfo=None) if p.created_at.tzinfo else p.created_at
-            if week_start <= created < week_end:
-                week_programs.append(p)
-        new_programs = len(week_programs)
-        
-        # Calculate XP (50 per step completed, estimate from current_step)
-        new_xp = sum(p.current_step * 50 for p in week_programs)
-        
-        cumulative_programs += new_programs
-        cumulative_xp += new_xp
-        
+        running = cumulative.get(week_num, running)
+
         # Format week label
         week_label = f"Week {week_num + 1}"
         if week_num == weeks - 1:
             week_label = "This Week"
         elif week_num == weeks - 2:
             week_label = "Last Week"
-        
+
         data_points.append(ProgressDataPoint(
             date=week_label,
-            programs=cumulative_programs,
-            xp=cumulative_xp
+            programs=running[0],
+            xp=running[1]
         ))
-    
+
     return ProgressTimelineResponse(data=data_points)
 
 
@@ -118,66 +142,26 @@ async def get_stakeholder_stats(
     Get aggregated stakeholder statistics across all user's programs.
     Groups stakeholders by name and counts by priority level.
     """
-    # Get all programs for this user
-    stmt = select(Program.id).where(Program.user_id == user_id)
+    # One JOIN round-trip fetching just the two columns we aggregate on —
+    # no second IN (...) query and no ORM object hydration.
+    stmt = select(Stakeholder.name, Stakeholder.priority).join(
+        Program, Program.id == Stakeholder.program_id
+    ).where(Program.user_id == user_id)
     result = await db.execute(stmt)
-    program_ids = [row[0] for row in result.fetchall()]
-    
-    if not program_ids:
-        # Return default categories with zero counts
-        return StakeholderStatsResponse(data=[
-            StakeholderDataPoint(category="Teachers", high=0, medium=0, low=0),
-            StakeholderDataPoint(category="Parents", high=0, medium=0, low=0),
-            StakeholderDataPoint(category="Officials", high=0, medium=0, low=0),
-            StakeholderDataPoint(category="NGO Partners", high=0, medium=0, low=0),
-            StakeholderDataPoint(category="Students", high=0, medium=0, low=0),
-        ])
-    
-    # Get all stakeholders for these programs
-    stmt = select(Stakeholder).where(Stakeholder.program_id.in_(program_ids))
-    result = await db.execute(stmt)
-    stakeholders = list(result.scalars().all())
-    
-    # Categorize stakeholders by name patterns
-    categories = {
-        "Teachers": {"high": 0, "medium": 0, "low": 0},
-        "Parents": {"high": 0, "medium": 0, "low": 0},
-        "Officials": {"high": 0, "medium": 0, "low": 0},
-        "NGO Partners": {"high": 0, "medium": 0, "low": 0},
-        "Students": {"high": 0, "medium": 0, "low": 0},
-    }
-    
-    for s in stakeholders:
-        name_lower = s.name.lower()
-        priority = (s.priority or "medium").lower()
-        
-        # Categorize based on name
-        if any(term in name_lower for term in ["teacher", "principal", "headmaster", "faculty"]):
-            cat = "Teachers"
-        elif any(term in name_lower for term in ["parent", "caregiver", "guardian", "family"]):
-            cat = "Parents"
-        elif any(term in name_lower for term in ["officer", "official", "beo", "crc", "government", "panchayat"]):
-            cat = "Officials"
-        elif any(term in name_lower for term in ["ngo", "partner", "organization", "foundation"]):
-            cat = "NGO Partners"
-        elif any(term in name_lower for term in ["student", "child", "learner", "youth"]):
-            cat = "Students"
-        else:
-            cat = "NGO Partners"  # Default category
-        
-        # Increment count
-        if priority in categories[cat]:
-            categories[cat][priority] += 1
-    
+
+    # Categorize stakeholders by name patterns into a 5x3 counts matrix;
+    # an empty result naturally yields the zero-filled default categories
+    counts = [[0, 0, 0] for _ in _CATEGORIES]
+
+    for name, priority in result.all():
+        match = _CATEGORY_PATTERN.search(name.lower())
+        cat_idx = _CATEGORY_IDX[match.lastgroup] if match else _DEFAULT_CATEGORY_IDX
+        counts[cat_idx][_PRIO_IDX.get((priority or "medium").lower(), 1)] += 1
+
     # Convert to response format
     data = [
-        StakeholderDataPoint(
-            category=cat,
-            high=counts["high"],
-            medium=counts["medium"],
-            low=counts["low"]
-        )
-        for cat, counts in categories.items()
+        StakeholderDataPoint(category=cat, high=row[0], medium=row[1], low=row[2])
+        for cat, row in zip(_CATEGORIES, counts)
     ]
-    
+
     return StakeholderStatsResponse(data=data)
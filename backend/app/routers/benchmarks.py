@@ -1,93 +1,108 @@
 """
 Benchmarks Router - FLN benchmarks and state statistics
 """
-import json
+import hashlib
+from collections import defaultdict
 from pathlib import Path
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
 from typing import Optional
 
-router = APIRouter(prefix="/api/benchmarks", tags=["benchmarks"])
+import orjson
+
+router = APIRouter(prefix="/api/benchmarks", default_response_class=ORJSONResponse, tags=["benchmarks"])
 
 # Load benchmark data
 DATA_PATH = Path(__file__).parent.parent / "data" / "benchmarks.json"
 
-def load_benchmarks():
-    """Load benchmark data from JSON file."""
-    try:
-        with open(DATA_PATH, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+try:
+    _RAW = DATA_PATH.read_bytes()
+except FileNotFoundError:
+    _RAW = b"{}"
+
+# The dataset is immutable per deploy, so parse once at import and precompute
+# the lookup structures every endpoint needs instead of re-reading per request.
+_BENCHMARKS = orjson.loads(_RAW)
+
+# One ETag for the whole dataset (blake2b is faster than SHA and this is
+# not a security hash); lets clients and CDNs revalidate with a 304
+# instead of re-downloading the statistics.
+_ETAG = '"' + hashlib.blake2b(_RAW, digest_size=16).hexdigest() + '"'
+_CACHE_HEADERS = {"ETag": _ETAG, "Cache-Control": "public, max-age=86400"}
+
+
+def _cacheable(request: Request, payload) -> Response:
+    """Serve `payload` with cache headers, or a bare 304 on an ETag hit."""
+    if request.headers.get("if-none-match") == _ETAG:
+        return Response(status_code=304, headers=_CACHE_HEADERS)
+    return ORJSONResponse(payload, headers=_CACHE_HEADERS)
+_STATES = _BENCHMARKS.get("state_statistics", [])
+_STATES_BY_NAME = {s["state"].lower(): s for s in _STATES}
+_STATES_BY_REGION: dict[str, list] = defaultdict(list)
+for _state in _STATES:
+    _STATES_BY_REGION[_state.get("region", "").lower()].append(_state)
+
+# National-average comparisons never change, so materialize the full
+# /states/{name} payload per state at import too.
+_NATIONAL = _BENCHMARKS.get("national_averages", {})
+_STATE_DETAILS = {
+    name: {
+        **state,
+        "comparison": {
+            "literacy_rate_diff": round(state["literacy_rate"] - _NATIONAL.get("literacy_rate", 0), 1),
+            "fln_proficiency_diff": round(state["fln_proficiency"] - _NATIONAL.get("fln_proficiency", 0), 1),
+            "dropout_rate_diff": round(state["dropout_rate"] - _NATIONAL.get("dropout_rate", 0), 1),
+        }
+    }
+    for name, state in _STATES_BY_NAME.items()
+}
 
 
 @router.get("/nipun")
-async def get_nipun_benchmarks():
+async def get_nipun_benchmarks(request: Request):
     """Get NIPUN Bharat FLN benchmarks by grade."""
-    data = load_benchmarks()
-    return data.get("nipun_bharat", {})
+    return _cacheable(request, _BENCHMARKS.get("nipun_bharat", {}))
 
 
 @router.get("/states")
-async def get_state_statistics(region: Optional[str] = None):
+async def get_state_statistics(request: Request, region: Optional[str] = None):
     """Get state-wise education statistics, optionally filtered by region."""
-    data = load_benchmarks()
-    states = data.get("state_statistics", [])
-    
     if region:
-        states = [s for s in states if s.get("region", "").lower() == region.lower()]
-    
-    return states
+        return _cacheable(request, _STATES_BY_REGION.get(region.lower(), []))
+    return _cacheable(request, _STATES)
 
 
 @router.get("/states/{state_name}")
-async def get_state_details(state_name: str):
+async def get_state_details(request: Request, state_name: str):
     """Get statistics for a specific state."""
-    data = load_benchmarks()
-    states = data.get("state_statistics", [])
-    
-    for state in states:
-        if state["state"].lower() == state_name.lower():
-            # Add comparison with national average
-            national = data.get("national_averages", {})
-            return {
-                **state,
-                "comparison": {
-                    "literacy_rate_diff": round(state["literacy_rate"] - national.get("literacy_rate", 0), 1),
-                    "fln_proficiency_diff": round(state["fln_proficiency"] - national.get("fln_proficiency", 0), 1),
-                    "dropout_rate_diff": round(state["dropout_rate"] - national.get("dropout_rate", 0), 1),
-                }
-            }
-    
-    raise HTTPException(status_code=404, detail="State not found")
+    details = _STATE_DETAILS.get(state_name.lower())
+    if not details:
+        raise HTTPException(status_code=404, detail="State not found")
+    return _cacheable(request, details)
 
 
 @router.get("/national")
-async def get_national_averages():
+async def get_national_averages(request: Request):
     """Get national average statistics."""
-    data = load_benchmarks()
-    return data.get("national_averages", {})
+    return _cacheable(request, _NATIONAL)
 
 
 @router.get("/fln-indicators")
-async def get_fln_indicators():
+async def get_fln_indicators(request: Request):
     """Get FLN indicator benchmarks by grade."""
-    data = load_benchmarks()
-    return data.get("fln_indicators", [])
+    return _cacheable(request, _BENCHMARKS.get("fln_indicators", []))
 
 
 @router.get("/compare")
-async def compare_states(state1: str, state2: str):
+async def compare_states(request: Request, state1: str, state2: str):
     """Compare two states on key metrics."""
-    data = load_benchmarks()
-    states = data.get("state_statistics", [])
-    
-    s1 = next((s for s in states if s["state"].lower() == state1.lower()), None)
-    s2 = next((s for s in states if s["state"].lower() == state2.lower()), None)
-    
+    s1 = _STATES_BY_NAME.get(state1.lower())
+    s2 = _STATES_BY_NAME.get(state2.lower())
+
     if not s1 or not s2:
         raise HTTPException(status_code=404, detail="One or both states not found")
-    
-    return {
+
+    return _cacheable(request, {
         "state1": s1,
         "state2": s2,
         "comparison": {
@@ -96,4 +111,4 @@ async def compare_states(state1: str, state2: str):
             "enrollment_rate": s1["enrollment_rate"] - s2["enrollment_rate"],
             "dropout_rate": s1["dropout_rate"] - s2["dropout_rate"],
         }
-    }
+    })
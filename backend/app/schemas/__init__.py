@@ -2,9 +2,9 @@
 Pydantic Schemas for API validation
 """
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 from uuid import UUID
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 
 # =====================================================
@@ -25,8 +25,8 @@ class UserResponse(UserBase):
     id: UUID
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    # frozen skips the post-init assignment machinery on each instance
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # =====================================================
@@ -57,8 +57,7 @@ class ProgramResponse(ProgramBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # =====================================================
@@ -67,7 +66,8 @@ class ProgramResponse(ProgramBase):
 
 class ProblemStatementBase(BaseModel):
     challenge_text: str = Field(..., min_length=10)
-    theme: Optional[str] = Field(None, pattern="^(FLN|Career Readiness|STEM|Life Skills|Other)$")
+    # Literal validates via set membership in pydantic-core, not a regex pass
+    theme: Optional[Literal["FLN", "Career Readiness", "STEM", "Life Skills", "Other"]] = None
 
 
 class ProblemStatementCreate(ProblemStatementBase):
@@ -90,8 +90,7 @@ class ProblemStatementResponse(ProblemStatementBase):
     is_completed: bool
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # =====================================================
@@ -102,7 +101,7 @@ class StakeholderBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
     role: str = Field(..., min_length=1, max_length=255)
     engagement_strategy: Optional[str] = None
-    priority: str = Field(default="medium", pattern="^(high|medium|low)$")
+    priority: Literal["high", "medium", "low"] = "medium"
 
 
 class StakeholderCreate(StakeholderBase):
@@ -123,8 +122,7 @@ class StakeholderResponse(StakeholderBase):
     is_ai_suggested: bool
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # =====================================================
@@ -144,9 +142,13 @@ class ProvenModelBase(BaseModel):
 class ProvenModelResponse(ProvenModelBase):
     id: UUID
     created_at: datetime
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    @classmethod
+    def from_row(cls, row) -> "ProvenModelResponse":
+        """Build from a trusted DB row, skipping validation (model_construct)."""
+        return cls.model_construct(**{name: getattr(row, name) for name in cls.model_fields})
 
 
 class ProgramProvenModelCreate(BaseModel):
@@ -162,8 +164,7 @@ class ProgramProvenModelResponse(BaseModel):
     notes: Optional[str]
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # =====================================================
@@ -191,8 +192,7 @@ class OutcomeResponse(OutcomeBase):
     program_id: UUID
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # =====================================================
@@ -200,7 +200,7 @@ class OutcomeResponse(OutcomeBase):
 # =====================================================
 
 class IndicatorBase(BaseModel):
-    type: str = Field(..., pattern="^(outcome|output)$")
+    type: Literal["outcome", "output"]
     description: str = Field(..., min_length=10)
     measurement_method: Optional[str] = None
     target_value: Optional[str] = None
@@ -229,8 +229,7 @@ class IndicatorResponse(IndicatorBase):
     is_ai_generated: bool
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # =====================================================
@@ -243,9 +242,13 @@ class BadgeResponse(BaseModel):
     description: Optional[str]
     icon: Optional[str]
     step_number: Optional[int]
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    @classmethod
+    def from_row(cls, row) -> "BadgeResponse":
+        """Build from a trusted DB row, skipping validation (model_construct)."""
+        return cls.model_construct(**{name: getattr(row, name) for name in cls.model_fields})
 
 
 class UserBadgeResponse(BaseModel):
@@ -254,8 +257,7 @@ class UserBadgeResponse(BaseModel):
     program_id: UUID
     earned_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 # =====================================================
@@ -290,7 +292,7 @@ class SuggestStakeholdersResponse(BaseModel):
 
 class GenerateIndicatorsRequest(BaseModel):
     outcome_description: str
-    theme: str = Field(..., pattern="^(FLN|Career Readiness|STEM|Life Skills|Other)$")
+    theme: Literal["FLN", "Career Readiness", "STEM", "Life Skills", "Other"]
 
 
 class GeneratedIndicator(BaseModel):
@@ -323,5 +325,4 @@ class FullProgramResponse(BaseModel):
     outcomes: List[OutcomeResponse]
     indicators: List[IndicatorResponse]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
@@ -2,10 +2,18 @@
 AI Service - Orchestrates AI calls for problem refinement, stakeholder suggestions, and indicator generation
 Enhanced with retry logic and Indian education context (NIPUN Bharat, NEP 2020)
 """
-import json
 import asyncio
+import hashlib
+import math
+import random
+import re
 import time
+from collections import OrderedDict, deque
 from typing import Optional
+
+import orjson
+from openai import APIConnectionError, APIStatusError, RateLimitError
+from pydantic import TypeAdapter
 from app.config import get_settings
 from app.schemas import (
     RefineProblemResponse,
@@ -20,6 +28,51 @@ MAX_RETRIES = 3
 BASE_DELAY = 1  # seconds
 MAX_DELAY = 30  # seconds
 
+# Transient provider failures worth retrying; hard 4xx errors are filtered
+# back out in _call_ai_with_retry so they fail fast instead of burning
+# MAX_RETRIES on a request that can never succeed
+_RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APIStatusError)
+
+# Exact-match response cache: identical prompts (demo reruns, CI, users
+# resubmitting the same text) return the stored completion instead of
+# re-paying the full token cost and multi-second latency
+_CACHE_MAX_ENTRIES = 1024
+_CACHE_TTL_SECONDS = 3600
+
+# Captures a fenced payload in one match — a single pass and a single
+# slice, versus the strip/startswith branch chain this replaced
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+# List adapters validate the untrusted LLM payloads in pydantic-core
+# (Rust) instead of a Python-level per-field comprehension; a malformed
+# element raises and lands in the same demo fallback a KeyError did
+_STAKEHOLDER_ADAPTER = TypeAdapter(list[SuggestedStakeholder])
+_INDICATOR_ADAPTER = TypeAdapter(list[GeneratedIndicator])
+
+# Output budgets sized per task: refinement returns ~400 tokens and
+# stakeholder lists ~600, so only indicator generation reserves the full
+# 2000-token budget. Short tasks stop decoding (and billing) sooner.
+_TASK_MAX_TOKENS = {
+    "refine_problem": 600,
+    "suggest_stakeholders": 800,
+    "generate_indicators": 2000,
+}
+_DEFAULT_MAX_TOKENS = 2000
+
+
+def _l2_normalize(vec: list[float]) -> list[float]:
+    """Unit-normalize an embedding so inner product equals cosine.
+
+    OpenAI embeddings are already ~unit-norm; this pins them exactly so
+    pgvector can rank with the cheaper <#> operator instead of <=>.
+    """
+    norm = math.sqrt(math.fsum(x * x for x in vec))
+    if norm == 0.0:
+        return vec
+    inv = 1.0 / norm
+    return [x * inv for x in vec]
+
+
 settings = get_settings()
 
 # System prompts for different AI tasks
@@ -119,6 +172,42 @@ Generate 3-4 outcome indicators and 2-3 output indicators."""
 }
 
 
+class RateBudget:
+    """Sliding-window request/token budget for outbound LLM calls.
+
+    Checked before each provider call, so saturation defers the call
+    in-process instead of being learned from a wasted 429 round-trip.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests: deque[float] = deque()
+        self._token_spend: deque[tuple[float, int]] = deque()
+        self._tokens_used = 0
+
+    async def acquire(self, tokens: int):
+        """Block until the budget has room, then record the spend."""
+        while True:
+            now = time.monotonic()
+            while self._requests and now - self._requests[0] > 60:
+                self._requests.popleft()
+            while self._token_spend and now - self._token_spend[0][0] > 60:
+                self._tokens_used -= self._token_spend.popleft()[1]
+            if len(self._requests) < self.rpm and self._tokens_used + tokens <= self.tpm:
+                self._requests.append(now)
+                self._token_spend.append((now, tokens))
+                self._tokens_used += tokens
+                return
+            # Sleep until the oldest window entry ages out
+            waits = [0.05]
+            if len(self._requests) >= self.rpm:
+                waits.append(self._requests[0] + 60 - now)
+            if self._token_spend and self._tokens_used + tokens > self.tpm:
+                waits.append(self._token_spend[0][0] + 60 - now)
+            await asyncio.sleep(max(waits))
+
+
 class AIService:
     """Service for AI-powered features using OpenAI, Groq, or Google Gemini."""
     
@@ -127,84 +216,268 @@ class AIService:
         self.gemini_client = None
         self.groq_client = None
         self.active_provider = None
+        # LRU with per-entry timestamps — OrderedDict because lru_cache
+        # can't wrap coroutines or honor a TTL
+        self._response_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        # task -> Gemini cached-content name, or False when the prompt
+        # couldn't be cached (e.g. below the model's minimum size)
+        self._gemini_caches: dict = {}
+        self._budget = RateBudget(
+            settings.llm_requests_per_minute, settings.llm_tokens_per_minute
+        )
         self._initialize_client()
     
     def _initialize_client(self):
         """Initialize the AI client based on available API keys."""
+        # Async clients: each completion awaits the HTTP round-trip instead
+        # of blocking the event loop, so concurrent AI calls overlap
+        # Binding _call_ai to the chosen backend here specializes the hot
+        # path once, instead of re-walking the provider branch on every call
+        if settings.groq_api_key or settings.openai_api_key:
+            import httpx
+            # One pooled transport for every completion/embedding call, so
+            # successive requests reuse warm TCP/TLS connections instead of
+            # paying a fresh handshake each time
+            # Generous read timeout for slow generations, short connect
+            # timeout so a dead endpoint fails fast into the retry path
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                timeout=httpx.Timeout(60.0, connect=5.0)
+            )
         if settings.groq_api_key:
-            from openai import OpenAI
-            self.groq_client = OpenAI(
+            from openai import AsyncOpenAI
+            self.groq_client = AsyncOpenAI(
                 api_key=settings.groq_api_key,
-                base_url="https://api.groq.com/openai/v1"
+                base_url="https://api.groq.com/openai/v1",
+                http_client=self._http_client
             )
             self.active_provider = "groq"
+            self._call_ai = self._call_groq
+            self._call_ai_stream = self._stream_groq
         elif settings.openai_api_key:
-            from openai import OpenAI
-            self.openai_client = OpenAI(api_key=settings.openai_api_key)
+            from openai import AsyncOpenAI
+            self.openai_client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                http_client=self._http_client
+            )
             self.active_provider = "openai"
+            self._call_ai = self._call_openai
+            self._call_ai_stream = self._stream_openai
         elif settings.google_api_key:
             from google import genai
             self.gemini_client = genai.Client(api_key=settings.google_api_key)
             self.active_provider = "gemini"
+            self._call_ai = self._call_gemini
+            self._call_ai_stream = self._stream_gemini
         else:
             raise ValueError("No AI API key configured. Set GROQ_API_KEY, OPENAI_API_KEY, or GOOGLE_API_KEY.")
+
+    async def aclose(self):
+        """Close the shared HTTP pool (called from app shutdown)."""
+        if getattr(self, "_http_client", None) is not None:
+            await self._http_client.aclose()
     
-    async def _call_ai(self, system_prompt: str, user_prompt: str) -> str:
-        """Make an AI API call and return the response."""
-        if self.groq_client:
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.7,
-                max_tokens=2000
-            )
-            return response.choices[0].message.content
-        elif self.openai_client:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.7,
-                max_tokens=2000
-            )
-            return response.choices[0].message.content
-        elif self.gemini_client:
-            prompt = f"{system_prompt}\n\nUser Query: {user_prompt}\n\nRespond with valid JSON only."
-            response = self.gemini_client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=prompt
-            )
-            return response.text
-        else:
-            raise ValueError("No AI client initialized")
-    
+    # _call_ai is bound to one of the backend methods below during
+    # _initialize_client. `task` doubles as a prompt-cache key: requests
+    # sharing the same fixed system prompt get routed to the same cache
+    # shard, so the provider processes the prompt prefix at cached rates.
+
+    async def _call_groq(self, system_prompt: str, user_prompt: str, task: str = "default") -> str:
+        """Make a Groq API call and return the response."""
+        response = await self.groq_client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.7,
+            max_tokens=_TASK_MAX_TOKENS.get(task, _DEFAULT_MAX_TOKENS)
+        )
+        return response.choices[0].message.content
+
+    async def _call_openai(self, system_prompt: str, user_prompt: str, task: str = "default") -> str:
+        """Make an OpenAI API call and return the response."""
+        response = await self.openai_client.chat.completions.create(
+            model="gpt-4-turbo-preview",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.7,
+            max_tokens=_TASK_MAX_TOKENS.get(task, _DEFAULT_MAX_TOKENS),
+            prompt_cache_key=f"{task}_v1"
+        )
+        return response.choices[0].message.content
+
+    async def _call_gemini(self, system_prompt: str, user_prompt: str, task: str = "default") -> str:
+        """Make a Gemini API call and return the response.
+
+        The static system prompt is registered as server-side cached
+        content once per task, so each call only sends (and bills) the
+        short user query at prefill time. Best-effort: if the cache can't
+        be created or has expired, the call falls back to inlining the
+        full prompt as before.
+        """
+        from google.genai import types
+
+        user_contents = f"User Query: {user_prompt}\n\nRespond with valid JSON only."
+
+        cache_name = self._gemini_caches.get(task)
+        if cache_name is None:
+            try:
+                cache = await self.gemini_client.aio.caches.create(
+                    model="gemini-2.0-flash",
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_prompt,
+                        ttl="3600s"
+                    )
+                )
+                cache_name = cache.name
+            except Exception:
+                cache_name = False
+            self._gemini_caches[task] = cache_name
+
+        if cache_name:
+            try:
+                response = await self.gemini_client.aio.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents=user_contents,
+                    config=types.GenerateContentConfig(cached_content=cache_name)
+                )
+                return response.text
+            except Exception:
+                # Cache likely expired server-side; rebuild on the next call
+                self._gemini_caches.pop(task, None)
+
+        response = await self.gemini_client.aio.models.generate_content(
+            model="gemini-2.0-flash",
+            contents=f"{system_prompt}\n\n{user_contents}"
+        )
+        return response.text
+
+    # Streaming variants: yield content deltas as the provider produces
+    # them, so time-to-first-token replaces full-generation latency for
+    # interactive consumers. The buffered methods above stay the path for
+    # anything that needs the complete JSON before parsing.
+
+    async def _stream_groq(self, system_prompt: str, user_prompt: str, task: str = "default"):
+        response = await self.groq_client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.7,
+            max_tokens=_TASK_MAX_TOKENS.get(task, _DEFAULT_MAX_TOKENS),
+            stream=True
+        )
+        async for chunk in response:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    async def _stream_openai(self, system_prompt: str, user_prompt: str, task: str = "default"):
+        response = await self.openai_client.chat.completions.create(
+            model="gpt-4-turbo-preview",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.7,
+            max_tokens=_TASK_MAX_TOKENS.get(task, _DEFAULT_MAX_TOKENS),
+            prompt_cache_key=f"{task}_v1",
+            stream=True
+        )
+        async for chunk in response:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    async def _stream_gemini(self, system_prompt: str, user_prompt: str, task: str = "default"):
+        prompt = f"{system_prompt}\n\nUser Query: {user_prompt}"
+        response = await self.gemini_client.aio.models.generate_content_stream(
+            model="gemini-2.0-flash",
+            contents=prompt
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    def refine_problem_stream(self, challenge_text: str):
+        """Stream the raw refinement tokens for interactive display."""
+        return self._call_ai_stream(
+            SYSTEM_PROMPTS["refine_problem"],
+            f"Challenge Statement: {challenge_text}",
+            task="refine_problem"
+        )
+
+    async def _call_ai_with_retry(self, system_prompt: str, user_prompt: str, task: str = "default") -> str:
+        """Call the AI backend, retrying transient failures with backoff.
+
+        Rate limits, dropped connections, and 5xx responses sleep
+        min(BASE_DELAY * 2**attempt + jitter, MAX_DELAY) and retry up to
+        MAX_RETRIES times; other API errors propagate immediately so the
+        callers' demo fallback handles them without wasted attempts.
+
+        Successful responses are cached by prompt hash for
+        _CACHE_TTL_SECONDS, so an exact repeat is a dict lookup.
+        """
+        key = hashlib.sha256(orjson.dumps(
+            {"p": self.active_provider, "s": system_prompt, "u": user_prompt}
+        )).hexdigest()
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            ts, response = cached
+            if time.time() - ts < _CACHE_TTL_SECONDS:
+                self._response_cache.move_to_end(key)
+                return response
+            del self._response_cache[key]
+
+        # Rough token estimate: ~4 chars/token for the prompt plus the
+        # task's full output budget
+        est_tokens = (len(system_prompt) + len(user_prompt)) // 4 \
+            + _TASK_MAX_TOKENS.get(task, _DEFAULT_MAX_TOKENS)
+
+        for attempt in range(MAX_RETRIES):
+            await self._budget.acquire(est_tokens)
+            try:
+                response = await self._call_ai(system_prompt, user_prompt, task=task)
+                self._response_cache[key] = (time.time(), response)
+                while len(self._response_cache) > _CACHE_MAX_ENTRIES:
+                    self._response_cache.popitem(last=False)
+                return response
+            except _RETRYABLE_ERRORS as e:
+                status_code = getattr(e, "status_code", None)
+                if (status_code is not None and status_code < 500
+                        and not isinstance(e, RateLimitError)):
+                    raise
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                # Full jitter keeps concurrent retries from re-colliding
+                delay = min(BASE_DELAY * (2 ** attempt) + random.uniform(0, 1), MAX_DELAY)
+                await asyncio.sleep(delay)
+
     def _parse_json_response(self, response: str) -> dict:
         """Parse JSON from AI response, handling potential formatting issues."""
-        # Clean up response if needed
-        response = response.strip()
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        return json.loads(response.strip())
+        m = _FENCE_RE.match(response)
+        # orjson tolerates surrounding whitespace, so the unfenced path
+        # needs no strip() copy
+        return orjson.loads(m.group(1) if m else response)
     
     async def refine_problem(self, challenge_text: str) -> RefineProblemResponse:
         """Refine a vague challenge statement into a structured problem."""
         try:
-            response = await self._call_ai(
+            response = await self._call_ai_with_retry(
                 SYSTEM_PROMPTS["refine_problem"],
-                f"Challenge Statement: {challenge_text}"
+                f"Challenge Statement: {challenge_text}",
+                task="refine_problem"
             )
             data = self._parse_json_response(response)
+            # Validating constructor on purpose — the payload is untrusted
+            # LLM output, so a wrong-typed field raises here and lands in
+            # the demo fallback instead of failing response validation
             return RefineProblemResponse(
                 refined_text=data["refined_text"],
                 root_causes=data["root_causes"],
@@ -235,22 +508,16 @@ class AIService:
             if theme:
                 user_prompt += f"\nTheme: {theme}"
             
-            response = await self._call_ai(
+            response = await self._call_ai_with_retry(
                 SYSTEM_PROMPTS["suggest_stakeholders"],
-                user_prompt
+                user_prompt,
+                task="suggest_stakeholders"
             )
             data = self._parse_json_response(response)
             
-            stakeholders = [
-                SuggestedStakeholder(
-                    name=s["name"],
-                    role=s["role"],
-                    engagement_strategy=s["engagement_strategy"],
-                    priority=s["priority"]
-                )
-                for s in data["stakeholders"]
-            ]
-            return SuggestStakeholdersResponse(stakeholders=stakeholders)
+            return SuggestStakeholdersResponse(
+                stakeholders=_STAKEHOLDER_ADAPTER.validate_python(data["stakeholders"])
+            )
         except Exception as e:
             print(f"AI API error (using demo fallback): {e}")
             return SuggestStakeholdersResponse(stakeholders=[
@@ -269,24 +536,16 @@ class AIService:
         try:
             user_prompt = f"Outcome: {outcome_description}\nTheme: {theme}"
             
-            response = await self._call_ai(
+            response = await self._call_ai_with_retry(
                 SYSTEM_PROMPTS["generate_indicators"],
-                user_prompt
+                user_prompt,
+                task="generate_indicators"
             )
             data = self._parse_json_response(response)
             
-            indicators = [
-                GeneratedIndicator(
-                    type=i["type"],
-                    description=i["description"],
-                    measurement_method=i["measurement_method"],
-                    target_value=i["target_value"],
-                    frequency=i["frequency"],
-                    data_source=i["data_source"]
-                )
-                for i in data["indicators"]
-            ]
-            return GenerateIndicatorsResponse(indicators=indicators)
+            return GenerateIndicatorsResponse(
+                indicators=_INDICATOR_ADAPTER.validate_python(data["indicators"])
+            )
         except Exception as e:
             print(f"AI API error (using demo fallback): {e}")
             return GenerateIndicatorsResponse(indicators=[
@@ -296,18 +555,60 @@ class AIService:
                 GeneratedIndicator(type="output", description="Number of teachers trained in intervention methodology", measurement_method="Training completion records", target_value="100% of target teachers", frequency="Once at start", data_source="Training records")
             ])
     
+    async def generate_all_indicators(
+        self,
+        items: list[tuple[str, str]]
+    ) -> list[GenerateIndicatorsResponse]:
+        """Generate indicators for several (outcome, theme) pairs at once.
+
+        The calls overlap at the network layer, so wall-clock time drops
+        from the sum of per-call latencies to roughly the slowest one; a
+        semaphore caps the fan-out below provider rate limits. Results
+        come back in input order, and per-call failures already resolve
+        to the demo fallback inside generate_indicators.
+        """
+        semaphore = asyncio.Semaphore(settings.llm_max_concurrent)
+
+        async def bounded(outcome_description: str, theme: str) -> GenerateIndicatorsResponse:
+            async with semaphore:
+                return await self.generate_indicators(outcome_description, theme)
+
+        return await asyncio.gather(*(bounded(o, t) for o, t in items))
+
     async def get_embedding(self, text: str) -> list[float]:
         """Get embedding for text (for RAG search)."""
         if self.openai_client:
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-ada-002",
+            # 3-small: same 1536 dimensions as ada-002, ~5x cheaper
+            response = await self.openai_client.embeddings.create(
+                model="text-embedding-3-small",
                 input=text
             )
-            return response.data[0].embedding
+            return _l2_normalize(response.data[0].embedding)
         else:
             # For Gemini, return a placeholder - would need Vertex AI for embeddings
             raise NotImplementedError("Embeddings not available with Gemini API. Use OpenAI.")
 
+    async def get_embeddings_batch(self, texts: list[str], batch_size: int = 512) -> list[list[float]]:
+        """Embed many texts at once (for bulk indexing).
+
+        Each request carries up to batch_size inputs and the batches run
+        concurrently, so the fixed per-request HTTP/TLS/dispatch cost is
+        paid once per batch instead of once per text.
+        """
+        if not self.openai_client:
+            raise NotImplementedError("Embeddings not available with Gemini API. Use OpenAI.")
+        responses = await asyncio.gather(*(
+            self.openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=texts[i:i + batch_size]
+            )
+            for i in range(0, len(texts), batch_size)
+        ))
+        return [
+            _l2_normalize(item.embedding)
+            for response in responses for item in response.data
+        ]
+
 
 # Singleton instance
 ai_service = AIService() if (settings.groq_api_key or settings.openai_api_key or settings.google_api_key) else None
@@ -1,12 +1,15 @@
 """
 Gamification Service - Handles XP, Streaks, and Leaderboard logic
 """
+import bisect
 from datetime import date, timedelta
 from typing import List, Optional
 from uuid import UUID
-from sqlalchemy import select, func
+from sqlalchemy import bindparam, case, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models import Program, UserBadge
+
 
 # XP Points for different actions
 XP_REWARDS = {
@@ -36,15 +39,44 @@ LEVEL_THRESHOLDS = [
 ]
 
 
+# Cumulative XP for having finished steps 1..k (step k = 100, 150, 150,
+# 200, 250): a program on current_step k has earned _CUM_STEP_XP[k-1].
+# Replaces the per-program inner loop with one index lookup.
+_CUM_STEP_XP = (0, 100, 250, 400, 600, 850)
+
+# One round-trip for the whole stats read: XP and completion count
+# aggregate over programs while the badge count rides along as a scalar
+# subquery, replacing two sequential SELECTs (plus the old per-program
+# Python iteration) with a single fixed-shape statement built at import
+_STEP_XP_CASE = case(
+    {step: _CUM_STEP_XP[step - 1] for step in range(1, 6)},
+    value=Program.current_step,
+    else_=0,
+)
+_STMT_USER_STATS = select(
+    func.coalesce(
+        func.sum(_STEP_XP_CASE + case((Program.status == 'completed', 100), else_=0)), 0
+    ).label('total_xp'),
+    func.coalesce(
+        func.sum(case((Program.status == 'completed', 1), else_=0)), 0
+    ).label('programs_completed'),
+    select(func.count())
+    .select_from(UserBadge)
+    .where(UserBadge.user_id == bindparam('uid'))
+    .scalar_subquery()
+    .label('badges_earned'),
+).where(Program.user_id == bindparam('uid'))
+
+
+# Thresholds split for bisect: the XP column is sorted, so the level for
+# any XP total is one binary search instead of walking the full table
+_LEVEL_XP = [threshold for _, threshold, _ in LEVEL_THRESHOLDS]
+_LEVEL_META = [(lvl, title) for lvl, _, title in LEVEL_THRESHOLDS]
+
+
 def calculate_level(total_xp: int) -> tuple[int, str]:
     """Calculate user level based on total XP."""
-    level = 1
-    title = 'Rookie'
-    for lvl, threshold, lvl_title in LEVEL_THRESHOLDS:
-        if total_xp >= threshold:
-            level = lvl
-            title = lvl_title
-    return level, title
+    return _LEVEL_META[bisect.bisect_right(_LEVEL_XP, total_xp) - 1]
 
 
 class GamificationService:
@@ -103,45 +135,20 @@ class GamificationService:
     
     async def get_user_stats(self, db: AsyncSession, user_id: UUID) -> dict:
         """Get gamification stats for a user from their actual programs."""
-        from app.models import Program, UserBadge
-        
-        # Get user's programs
-        stmt = select(Program).where(Program.user_id == user_id)
-        result = await db.execute(stmt)
-        programs = list(result.scalars().all())
-        
-        # Calculate XP based on program steps completed
-        # Each step gives XP: step 1 = 100, step 2 = 150, step 3 = 150, step 4 = 200, step 5 = 250
-        step_xp = {1: 100, 2: 150, 3: 150, 4: 200, 5: 250}
-        total_xp = 0
-        programs_completed = 0
-        
-        for program in programs:
-            # XP for each completed step (steps before current_step)
-            for step in range(1, program.current_step):
-                total_xp += step_xp.get(step, 100)
-            
-            if program.status == 'completed':
-                programs_completed += 1
-                # Bonus XP for completion
-                total_xp += 100
-        
-        # Get badges earned
-        badges_stmt = select(func.count()).select_from(UserBadge).where(UserBadge.user_id == user_id)
-        badges_result = await db.execute(badges_stmt)
-        badges_earned = badges_result.scalar() or 0
-        
-        # Calculate level
-        level, level_title = calculate_level(total_xp)
-        
-        # Calculate XP to next level
-        next_level_threshold = 0
-        for lvl, threshold, _ in LEVEL_THRESHOLDS:
-            if lvl == level + 1:
-                next_level_threshold = threshold
-                break
-        xp_to_next_level = max(0, next_level_threshold - total_xp)
-        
+        row = (await db.execute(_STMT_USER_STATS, {"uid": user_id})).one()
+        total_xp = row.total_xp
+        programs_completed = row.programs_completed
+        badges_earned = row.badges_earned
+
+        # Calculate level and distance to the next threshold directly
+        # from the sorted XP column — no second walk of the table
+        idx = bisect.bisect_right(_LEVEL_XP, total_xp) - 1
+        level, level_title = _LEVEL_META[idx]
+        if idx + 1 < len(_LEVEL_XP):
+            xp_to_next_level = _LEVEL_XP[idx + 1] - total_xp
+        else:
+            xp_to_next_level = 0
+
         return {
             'total_xp': total_xp,
             'level': level,
@@ -1,8 +1,15 @@
 """
 PDF Generation Service - Creates professional Program Design Documents
 """
+import asyncio
 import io
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from copy import copy
+from functools import partial
+from xml.sax.saxutils import escape
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -13,59 +20,133 @@ from reportlab.platypus import (
 )
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
+# Bounded pool for PDF rendering: builds run in parallel with each other
+# and with LLM calls, but a burst of exports can't spawn unlimited threads
+_PDF_MAX_WORKERS = min(os.cpu_count() or 1, 8)
+_PDF_EXECUTOR = ThreadPoolExecutor(
+    max_workers=_PDF_MAX_WORKERS,
+    thread_name_prefix="pdf"
+)
+
+# Recycled output buffers: high-volume exports reuse already-grown
+# BytesIO objects instead of reallocating one per document. Capped at the
+# worker count since at most that many builds run at once.
+# (SimpleDocTemplate itself is not safely reusable across builds, so each
+# document still gets a fresh one — that init is cheap.)
+_BUFFER_POOL: queue.SimpleQueue = queue.SimpleQueue()
+
+
+def _build_styles():
+    """Build the document stylesheet with the custom paragraph styles."""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(
+        name='DocTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#1a365d')
+    ))
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceBefore=20,
+        spaceAfter=12,
+        textColor=colors.HexColor('#2d3748')
+    ))
+    styles.add(ParagraphStyle(
+        name='SubHeader',
+        parent=styles['Heading3'],
+        fontSize=12,
+        spaceBefore=12,
+        spaceAfter=8,
+        textColor=colors.HexColor('#4a5568')
+    ))
+    styles.add(ParagraphStyle(
+        name='DocBody',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=8,
+        leading=16
+    ))
+    return styles
+
+
+# Styles and table commands never change between documents — parse and
+# register them once at import instead of per service instance / per call
+_STYLES = _build_styles()
+
+_STAKEHOLDER_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2d3748')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f7fafc')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+_INDICATOR_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a5568')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+
+# Static paragraphs parsed by ReportLab's mini-XML parser once at import.
+# Flowables pick up layout state during doc.build and builds run
+# concurrently on the worker pool, so each use takes a shallow copy — the
+# parsed text stays shared, only the per-build state is fresh.
+_TITLE_PARAGRAPH = Paragraph("Program Design Document", _STYLES['DocTitle'])
+_FOOTER_PARAGRAPH = Paragraph("Created with LogicForge", _STYLES['DocBody'])
+_TOC_FLOWABLES = (
+    Paragraph("Table of Contents", _STYLES['SectionHeader']),
+    Paragraph("1. Challenge Statement & Root Cause Analysis", _STYLES['DocBody']),
+    Paragraph("2. Stakeholder Mapping", _STYLES['DocBody']),
+    Paragraph("3. Evidence-Based Interventions", _STYLES['DocBody']),
+    Paragraph("4. Outcomes & Indicators", _STYLES['DocBody']),
+    Paragraph("5. Monitoring Framework", _STYLES['DocBody']),
+)
+
 
 class PDFService:
     """Service for generating Program Design Document PDFs."""
-    
+
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._add_custom_styles()
-    
-    def _add_custom_styles(self):
-        """Add custom paragraph styles."""
-        self.styles.add(ParagraphStyle(
-            name='DocTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#1a365d')
-        ))
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            spaceBefore=20,
-            spaceAfter=12,
-            textColor=colors.HexColor('#2d3748')
-        ))
-        self.styles.add(ParagraphStyle(
-            name='SubHeader',
-            parent=self.styles['Heading3'],
-            fontSize=12,
-            spaceBefore=12,
-            spaceAfter=8,
-            textColor=colors.HexColor('#4a5568')
-        ))
-        self.styles.add(ParagraphStyle(
-            name='DocBody',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceAfter=8,
-            leading=16
-        ))
-    
+        self.styles = _STYLES
+
     def generate_program_document(
         self,
         program_title: str,
-        problem_statement: dict,
+        problem_statement,
         stakeholders: list,
         proven_models: list,
         outcomes: list,
-        indicators: list
     ) -> bytes:
-        """Generate a complete program design document PDF."""
-        buffer = io.BytesIO()
+        """Generate a complete program design document PDF.
+
+        Takes the ORM objects directly (outcomes carry their indicators) —
+        no per-record dict copies on the caller side.
+        """
+        try:
+            buffer = _BUFFER_POOL.get_nowait()
+        except queue.Empty:
+            buffer = io.BytesIO()
         doc = SimpleDocTemplate(
             buffer,
             pagesize=A4,
@@ -79,31 +160,19 @@ class PDFService:
         
         # Title Page
         story.append(Spacer(1, 2*inch))
-        story.append(Paragraph("Program Design Document", self.styles['DocTitle']))
+        story.append(copy(_TITLE_PARAGRAPH))
         story.append(Spacer(1, 0.5*inch))
-        story.append(Paragraph(program_title, self.styles['SectionHeader']))
+        story.append(Paragraph(escape(program_title), self.styles['SectionHeader']))
         story.append(Spacer(1, 1*inch))
         story.append(Paragraph(
             f"Generated on {datetime.now().strftime('%B %d, %Y')}",
             self.styles['DocBody']
         ))
-        story.append(Paragraph(
-            "Created with LogicForge",
-            self.styles['DocBody']
-        ))
+        story.append(copy(_FOOTER_PARAGRAPH))
         story.append(PageBreak())
-        
+
         # Table of Contents
-        story.append(Paragraph("Table of Contents", self.styles['SectionHeader']))
-        toc_items = [
-            "1. Challenge Statement & Root Cause Analysis",
-            "2. Stakeholder Mapping",
-            "3. Evidence-Based Interventions",
-            "4. Outcomes & Indicators",
-            "5. Monitoring Framework"
-        ]
-        for item in toc_items:
-            story.append(Paragraph(item, self.styles['DocBody']))
+        story.extend(copy(flowable) for flowable in _TOC_FLOWABLES)
         story.append(PageBreak())
         
         # Section 1: Problem Statement
@@ -112,26 +181,26 @@ class PDFService:
         if problem_statement:
             story.append(Paragraph("Challenge Statement", self.styles['SubHeader']))
             story.append(Paragraph(
-                problem_statement.get('challenge_text', 'Not provided'),
+                escape(problem_statement.challenge_text or 'Not provided'),
                 self.styles['DocBody']
             ))
             
-            if problem_statement.get('refined_text'):
+            if problem_statement.refined_text:
                 story.append(Paragraph("Refined Problem Statement", self.styles['SubHeader']))
                 story.append(Paragraph(
-                    problem_statement['refined_text'],
+                    escape(problem_statement.refined_text),
                     self.styles['DocBody']
                 ))
             
-            root_causes = problem_statement.get('root_causes', [])
+            root_causes = problem_statement.root_causes or []
             if root_causes:
                 story.append(Paragraph("Root Causes", self.styles['SubHeader']))
                 for i, cause in enumerate(root_causes, 1):
-                    story.append(Paragraph(f"{i}. {cause}", self.styles['DocBody']))
+                    story.append(Paragraph(f"{i}. {escape(cause)}", self.styles['DocBody']))
             
-            if problem_statement.get('theme'):
+            if problem_statement.theme:
                 story.append(Paragraph(
-                    f"<b>Theme:</b> {problem_statement['theme']}",
+                    f"<b>Theme:</b> {escape(problem_statement.theme)}",
                     self.styles['DocBody']
                 ))
         
@@ -143,29 +212,19 @@ class PDFService:
         if stakeholders:
             stakeholder_data = [['Stakeholder', 'Role', 'Engagement Strategy', 'Priority']]
             for s in stakeholders:
+                strategy = s.engagement_strategy or ''
                 stakeholder_data.append([
-                    s.get('name', ''),
-                    s.get('role', ''),
-                    s.get('engagement_strategy', '')[:50] + '...' if s.get('engagement_strategy', '') and len(s.get('engagement_strategy', '')) > 50 else s.get('engagement_strategy', ''),
-                    s.get('priority', 'medium').capitalize()
+                    s.name or '',
+                    s.role or '',
+                    strategy[:50] + '...' if len(strategy) > 50 else strategy,
+                    (s.priority or 'medium').capitalize()
                 ])
             
-            stakeholder_table = Table(stakeholder_data, colWidths=[1.5*inch, 1.5*inch, 2.5*inch, 0.8*inch])
-            stakeholder_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2d3748')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f7fafc')),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            story.append(stakeholder_table)
+            story.append(Table(
+                stakeholder_data,
+                colWidths=[1.5*inch, 1.5*inch, 2.5*inch, 0.8*inch],
+                style=_STAKEHOLDER_TABLE_STYLE
+            ))
         else:
             story.append(Paragraph("No stakeholders defined.", self.styles['DocBody']))
         
@@ -176,12 +235,12 @@ class PDFService:
         
         if proven_models:
             for model in proven_models:
-                story.append(Paragraph(f"<b>{model.get('name', 'Unnamed Model')}</b>", self.styles['SubHeader']))
-                story.append(Paragraph(model.get('description', ''), self.styles['DocBody']))
+                story.append(Paragraph(f"<b>{escape(model.name or 'Unnamed Model')}</b>", self.styles['SubHeader']))
+                story.append(Paragraph(escape(model.description or ''), self.styles['DocBody']))
                 
-                if model.get('evidence_base'):
+                if model.evidence_base:
                     story.append(Paragraph(
-                        f"<i>Evidence Base:</i> {model['evidence_base']}",
+                        f"<i>Evidence Base:</i> {escape(model.evidence_base)}",
                         self.styles['DocBody']
                     ))
                 story.append(Spacer(1, 0.2*inch))
@@ -196,39 +255,26 @@ class PDFService:
         if outcomes:
             for outcome in outcomes:
                 story.append(Paragraph(
-                    f"<b>Outcome:</b> {outcome.get('description', '')}",
+                    f"<b>Outcome:</b> {escape(outcome.description or '')}",
                     self.styles['SubHeader']
                 ))
                 
-                outcome_id = outcome.get('id')
-                outcome_indicators = [i for i in indicators if i.get('outcome_id') == outcome_id]
-                
-                if outcome_indicators:
+                if outcome.indicators:
                     indicator_data = [['Type', 'Indicator', 'Target', 'Frequency']]
-                    for ind in outcome_indicators:
+                    for ind in outcome.indicators:
+                        desc = ind.description or ''
                         indicator_data.append([
-                            ind.get('type', '').capitalize(),
-                            ind.get('description', '')[:60] + '...' if len(ind.get('description', '')) > 60 else ind.get('description', ''),
-                            ind.get('target_value', ''),
-                            ind.get('frequency', '')
+                            (ind.type or '').capitalize(),
+                            desc[:60] + '...' if len(desc) > 60 else desc,
+                            ind.target_value or '',
+                            ind.frequency or ''
                         ])
                     
-                    indicator_table = Table(indicator_data, colWidths=[0.8*inch, 3.5*inch, 1.2*inch, 0.8*inch])
-                    indicator_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a5568')),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 9),
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                        ('FONTSIZE', (0, 1), (-1, -1), 8),
-                        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ]))
-                    story.append(indicator_table)
+                    story.append(Table(
+                        indicator_data,
+                        colWidths=[0.8*inch, 3.5*inch, 1.2*inch, 0.8*inch],
+                        style=_INDICATOR_TABLE_STYLE
+                    ))
                 story.append(Spacer(1, 0.3*inch))
         else:
             story.append(Paragraph("No outcomes defined.", self.styles['DocBody']))
@@ -236,10 +282,25 @@ class PDFService:
         # Build PDF
         doc.build(story)
         pdf_bytes = buffer.getvalue()
-        buffer.close()
-        
+        buffer.seek(0)
+        buffer.truncate(0)
+        if _BUFFER_POOL.qsize() < _PDF_MAX_WORKERS:
+            _BUFFER_POOL.put(buffer)
+
         return pdf_bytes
 
+    async def generate_program_document_async(self, **kwargs) -> bytes:
+        """Render the document on a worker thread.
+
+        reportlab layout is synchronous and CPU-bound; running it inline
+        in an async route would stall the event loop for the whole build.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _PDF_EXECUTOR,
+            partial(self.generate_program_document, **kwargs)
+        )
+
 
 # Singleton instance
 pdf_service = PDFService()
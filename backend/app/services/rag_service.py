@@ -1,63 +1,267 @@
 """
 RAG Service - Vector search for Proven Models
 """
-from typing import List, Optional
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional
 from uuid import UUID
-from sqlalchemy import select, text
+from openai import OpenAIError
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from app.config import get_settings
+from app.database import get_session_factory
 from app.models import ProvenModel
 from app.services.ai_service import get_ai_service
 
+# Repeated searches (browsing back and forth, demo reruns) skip both the
+# embedding RPC and the vector query for this long
+_QUERY_CACHE_MAX = 4096
+_QUERY_CACHE_TTL = 300.0  # seconds
+
+# How long to wait on the embedding RPC before serving the speculative
+# keyword result instead — a stalled OpenAI call never blocks the user
+_EMBED_FAST_BUDGET = 2.0  # seconds
+
+# The catalog only changes when the seed script runs, so browse listings
+# can be served from memory for a short window
+_ALL_CACHE_TTL = 60.0  # seconds
+
+# Concurrent searches landing within this window share one embeddings
+# request — the per-call HTTP/TLS/dispatch cost is paid once per batch
+_EMBED_BATCH_WINDOW = 0.005  # seconds
+_EMBED_BATCH_MAX = 32
+
+# ef_search for recall="high" callers: 2x the configured default, worth
+# the extra candidates when result quality matters more than latency
+_EF_SEARCH_HIGH = 200
+
+# Fixed-shape search statements built once at import (the repo's usual
+# pattern): handlers pass only bind values, so SQLAlchemy skips Select
+# construction per call and Postgres hits its prepared-plan cache.
+# Ordering by distance in the index with the embedding column deferred —
+# the 3 KB vector per row never crosses the wire.
+_STMT_SEARCH = (
+    select(ProvenModel)
+    .options(defer(ProvenModel.embedding))
+    .where(ProvenModel.embedding.isnot(None))
+    # Embeddings are stored unit-norm, so max_inner_product (<#>) ranks
+    # identically to cosine_distance while skipping the norm computation
+    # on every comparison the index scan makes
+    .order_by(ProvenModel.embedding.max_inner_product(
+        bindparam("emb", type_=ProvenModel.embedding.type)
+    ))
+    .limit(bindparam("lim"))
+)
+# @> containment so the GIN index prunes candidates first
+_STMT_SEARCH_THEME = _STMT_SEARCH.where(
+    ProvenModel.themes.contains(bindparam("themes", type_=ProvenModel.themes.type))
+)
+
+# Keyword fallback: one indexed @@ match against the generated weighted
+# tsvector (name > description > outcomes) instead of three OR'd ILIKEs
+# that each scanned every row. websearch_to_tsquery parses free-form
+# user input (quotes, OR, -exclusions) without ever raising.
+_TS_QUERY = func.websearch_to_tsquery("english", bindparam("q"))
+_STMT_KEYWORD = (
+    select(ProvenModel)
+    .options(defer(ProvenModel.embedding))
+    .where(ProvenModel.search_doc.op("@@")(_TS_QUERY))
+    .order_by(func.ts_rank(ProvenModel.search_doc, _TS_QUERY).desc())
+    .limit(bindparam("lim"))
+)
+_STMT_KEYWORD_THEME = _STMT_KEYWORD.where(
+    ProvenModel.themes.contains(bindparam("themes", type_=ProvenModel.themes.type))
+)
+
+# Transaction-scoped planner knobs in one round-trip (set_config with
+# is_local=true == SET LOCAL): the HNSW candidate-list size and parallel
+# workers for any scan the planner parallelizes. SET LOCAL means nothing
+# leaks across the pooled connection.
+_STMT_SEARCH_KNOBS = text(
+    "SELECT set_config('hnsw.ef_search', :ef, true), "
+    "set_config('max_parallel_workers_per_gather', '4', true)"
+)
+
+# Pull the HNSW index and heap into shared buffers so the first real
+# query after a restart walks warm pages instead of paying cold reads
+_STMT_PREWARM = text(
+    "SELECT pg_prewarm('ix_proven_models_embedding_hnsw_ip', 'buffer'), "
+    "pg_prewarm('proven_models', 'buffer')"
+)
+
+
+class _EmbedCoalescer:
+    """Folds concurrent get_embedding calls into one batched API request.
+
+    Each submit parks on a future; the first arrival schedules a flush
+    after a short window (or immediately once the batch fills), and one
+    get_embeddings_batch call resolves every waiter. Under load N HTTP
+    round-trips collapse to one; a lone query pays at most the window.
+    """
+
+    def __init__(self, window: float = _EMBED_BATCH_WINDOW, max_batch: int = _EMBED_BATCH_MAX):
+        self._window = window
+        self._max_batch = max_batch
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._flush_timer: Optional[asyncio.Task] = None
+
+    async def submit(self, query: str) -> list[float]:
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending.append((query, fut))
+        if len(self._pending) >= self._max_batch:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            asyncio.ensure_future(self._flush())
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_after_window())
+        return await fut
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self._window)
+        self._flush_timer = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            embeddings = await get_ai_service().get_embeddings_batch(
+                [query for query, _ in batch]
+            )
+            for (_, fut), embedding in zip(batch, embeddings):
+                if not fut.done():  # waiter may have timed out and gone
+                    fut.set_result(embedding)
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+
 
 class RAGService:
     """Service for semantic search over proven models using pgvector."""
-    
+
+    def __init__(self, ef_search: Optional[int] = None):
+        # Per-query HNSW candidate-list size; settings-driven so deploys
+        # can trade recall against latency without a code change
+        self.ef_search = ef_search if ef_search is not None else get_settings().hnsw_ef_search
+        # Whitespace-normalized query text -> ranked model ids. Ids, not
+        # ORM objects: rows are session-bound, so hits re-hydrate with a
+        # single IN (...) select under the caller's session.
+        self._query_cache: OrderedDict[tuple, tuple[float, list[UUID]]] = OrderedDict()
+        # (theme_filter, limit) -> ids for the browse listing; the key
+        # space is tiny (five themes x a couple of page sizes), so a plain
+        # TTL dict needs no eviction policy
+        self._all_cache: dict[tuple, tuple[float, list[UUID]]] = {}
+        self._embed_batcher = _EmbedCoalescer()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def prewarm(self, db: AsyncSession) -> None:
+        """Warm the vector index and table pages at startup. Best-effort:
+        if pg_prewarm is unavailable the first query warms them instead."""
+        try:
+            await db.execute(_STMT_PREWARM)
+        except Exception:
+            pass
+
+    async def _models_by_ids(self, db: AsyncSession, ids: List[UUID]) -> List[ProvenModel]:
+        """Hydrate models for cached ids in one query, keeping rank order."""
+        if not ids:
+            return []
+        result = await db.execute(
+            select(ProvenModel)
+            .options(defer(ProvenModel.embedding))
+            .where(ProvenModel.id.in_(ids))
+        )
+        by_id = {m.id: m for m in result.scalars()}
+        return [by_id[i] for i in ids if i in by_id]
+
     async def search_models(
         self,
         db: AsyncSession,
         query: str,
         limit: int = 5,
-        theme_filter: Optional[str] = None
+        theme_filter: Optional[str] = None,
+        recall: str = "default"
     ) -> List[ProvenModel]:
         """
         Search for proven models using semantic similarity.
         Falls back to keyword search if embeddings are not available.
+
+        recall="high" doubles the HNSW candidate list for quality-sensitive
+        callers at some latency cost.
         """
+        cache_key = (" ".join(query.lower().split()), theme_filter, limit, recall)
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            ts, ids = cached
+            if time.monotonic() - ts < _QUERY_CACHE_TTL:
+                self._query_cache.move_to_end(cache_key)
+                self.cache_hits += 1
+                return await self._models_by_ids(db, ids)
+            del self._query_cache[cache_key]
+        self.cache_misses += 1
+
+        # Speculative keyword prefetch overlapping the embedding RPC, so a
+        # slow or failed embedding call costs max(emb, kw) instead of
+        # emb + kw. Runs on its own session — an AsyncSession cannot serve
+        # two in-flight statements.
+        async def _kw_prefetch() -> List[ProvenModel]:
+            async with get_session_factory()() as kw_db:
+                return await self.keyword_search(kw_db, query, limit, theme_filter)
+
+        kw_task = asyncio.create_task(_kw_prefetch())
         try:
-            # Try to get embedding for semantic search
-            ai_service = get_ai_service()
-            embedding = await ai_service.get_embedding(query)
-            
-            # Build the vector similarity query
-            sql = """
-                SELECT *, embedding <=> :embedding AS distance
-                FROM proven_models
-                WHERE embedding IS NOT NULL
-            """
-            
-            params = {"embedding": str(embedding), "limit": limit}
-            
+            embedding = await asyncio.wait_for(
+                self._embed_batcher.submit(query), timeout=_EMBED_FAST_BUDGET
+            )
+        except (TimeoutError, ValueError, NotImplementedError, OpenAIError):
+            # Known degraded modes only — over budget, no provider
+            # configured, or the provider call failed. The fallback answer
+            # is already (nearly) in hand; anything else is a bug and
+            # propagates.
+            return await kw_task
+
+        # Embedding won the race; drop the speculative query
+        kw_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await kw_task
+
+        try:
+            # Widen the HNSW candidate list for this transaction (better
+            # recall than Postgres's default ef_search=40) and allow the
+            # planner parallel workers — one round-trip for both knobs
+            ef = _EF_SEARCH_HIGH if recall == "high" else self.ef_search
+            await db.execute(_STMT_SEARCH_KNOBS, {"ef": str(ef)})
+
             if theme_filter:
-                sql += " AND :theme = ANY(themes)"
-                params["theme"] = theme_filter
-            
-            sql += " ORDER BY distance LIMIT :limit"
-            
-            result = await db.execute(text(sql), params)
-            rows = result.fetchall()
-            
-            # Convert to ProvenModel objects
-            models = []
-            for row in rows:
-                model = await db.get(ProvenModel, row.id)
-                if model:
-                    models.append(model)
-            
-            return models
-            
-        except Exception:
-            # Fallback to keyword search
+                result = await db.execute(
+                    _STMT_SEARCH_THEME,
+                    {"emb": embedding, "lim": limit, "themes": [theme_filter]},
+                )
+            else:
+                result = await db.execute(
+                    _STMT_SEARCH, {"emb": embedding, "lim": limit}
+                )
+            models = list(result.scalars().all())
+        except ProgrammingError:
+            # Schema-level failure (pgvector extension or index missing) —
+            # keyword search still works. Roll back first: the aborted
+            # transaction would reject the fallback query otherwise. Not
+            # cached, so recovery is picked up immediately.
+            await db.rollback()
             return await self.keyword_search(db, query, limit, theme_filter)
+
+        self._query_cache[cache_key] = (time.monotonic(), [m.id for m in models])
+        while len(self._query_cache) > _QUERY_CACHE_MAX:
+            self._query_cache.popitem(last=False)
+        return models
     
     async def keyword_search(
         self,
@@ -66,21 +270,14 @@ class RAGService:
         limit: int = 5,
         theme_filter: Optional[str] = None
     ) -> List[ProvenModel]:
-        """Fallback keyword-based search."""
-        query_lower = f"%{query.lower()}%"
-        
-        stmt = select(ProvenModel).where(
-            (ProvenModel.name.ilike(query_lower)) |
-            (ProvenModel.description.ilike(query_lower)) |
-            (ProvenModel.target_outcomes.any(query_lower))
-        )
-        
+        """Fallback full-text search, ranked by ts_rank."""
         if theme_filter:
-            stmt = stmt.where(ProvenModel.themes.any(theme_filter))
-        
-        stmt = stmt.limit(limit)
-        
-        result = await db.execute(stmt)
+            result = await db.execute(
+                _STMT_KEYWORD_THEME,
+                {"q": query, "lim": limit, "themes": [theme_filter]},
+            )
+        else:
+            result = await db.execute(_STMT_KEYWORD, {"q": query, "lim": limit})
         return list(result.scalars().all())
     
     async def get_all_models(
@@ -90,15 +287,48 @@ class RAGService:
         limit: int = 20
     ) -> List[ProvenModel]:
         """Get all proven models, optionally filtered by theme."""
-        stmt = select(ProvenModel)
-        
+        cache_key = (theme_filter, limit)
+        cached = self._all_cache.get(cache_key)
+        if cached is not None:
+            ts, ids = cached
+            if time.monotonic() - ts < _ALL_CACHE_TTL:
+                return await self._models_by_ids(db, ids)
+            del self._all_cache[cache_key]
+
+        stmt = select(ProvenModel).options(defer(ProvenModel.embedding))
+
         if theme_filter:
-            stmt = stmt.where(ProvenModel.themes.any(theme_filter))
-        
+            stmt = stmt.where(ProvenModel.themes.contains([theme_filter]))
+
         stmt = stmt.limit(limit)
-        
+
         result = await db.execute(stmt)
-        return list(result.scalars().all())
+        models = list(result.scalars().all())
+        self._all_cache[cache_key] = (time.monotonic(), [m.id for m in models])
+        return models
+
+    async def stream_all_models(
+        self,
+        db: AsyncSession,
+        theme_filter: Optional[str] = None,
+    ) -> AsyncIterator[ProvenModel]:
+        """Stream the full catalog without materializing it in memory.
+
+        Server-side cursor (yield_per) keeps only one page of rows
+        hydrated at a time — use this instead of get_all_models for
+        unbounded walks (exports, re-embedding jobs).
+        """
+        stmt = (
+            select(ProvenModel)
+            .options(defer(ProvenModel.embedding))
+            .execution_options(yield_per=100)
+        )
+
+        if theme_filter:
+            stmt = stmt.where(ProvenModel.themes.contains([theme_filter]))
+
+        async for model in await db.stream_scalars(stmt):
+            yield model
 
 
 # Singleton instance
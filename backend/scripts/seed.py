@@ -0,0 +1,222 @@
+"""
+One-shot database seeding script.
+
+Run once per deploy (instead of on every app startup):
+
+    cd backend && python -m scripts.seed
+
+Creates extensions and tables, applies lightweight column migrations, and
+seeds proven models and badges. Safe to run concurrently — a Postgres
+advisory lock makes parallel invocations (e.g. multiple deploy hooks) no-op
+while the first one works.
+"""
+import asyncio
+
+from sqlalchemy import text
+
+from app.database import get_engine
+
+# Seed SQL compiled to TextClause once at import, not per call
+_LOCK_SEED = text("SELECT pg_advisory_xact_lock(hashtext('logicforge_seed'))")
+# One statement per execute: asyncpg prepares every statement, and
+# Postgres rejects multi-command strings in prepared statements
+_CREATE_EXTENSIONS = (
+    text("CREATE EXTENSION IF NOT EXISTS vector"),
+    text('CREATE EXTENSION IF NOT EXISTS "uuid-ossp"'),
+)
+# Immutable wrapper so the generated search_doc column can fold
+# target_outcomes in (array_to_string itself is only STABLE, which
+# generated columns reject). Must exist before create_all builds
+# proven_models.
+_CREATE_OUTCOMES_TEXT_FN = text("""
+    CREATE OR REPLACE FUNCTION outcomes_text(text[]) RETURNS text
+    IMMUTABLE PARALLEL SAFE LANGUAGE sql
+    AS $$ SELECT coalesce(array_to_string($1, ' '), '') $$
+""")
+_MIGRATE_BADGES_XP = text("ALTER TABLE badges ADD COLUMN IF NOT EXISTS xp_reward INTEGER DEFAULT 0")
+_MIGRATE_EMBEDDING_HALFVEC = text(
+    "ALTER TABLE proven_models ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536)"
+)
+_MIGRATE_ROOT_CAUSES_JSONB = text(
+    "ALTER TABLE problem_statements ALTER COLUMN root_causes TYPE jsonb USING root_causes::jsonb"
+)
+# Separate from _CREATE_EXTENSIONS: pg_prewarm is not installed on every
+# managed Postgres, and its absence must not fail the whole seed
+_CREATE_PREWARM_EXTENSION = text("CREATE EXTENSION IF NOT EXISTS pg_prewarm")
+_MIGRATE_EMBEDDING_IP_INDEX = (
+    text("DROP INDEX IF EXISTS ix_proven_models_embedding_hnsw"),
+    text(
+        "CREATE INDEX IF NOT EXISTS ix_proven_models_embedding_hnsw_ip "
+        "ON proven_models USING hnsw (embedding halfvec_ip_ops)"
+    ),
+)
+_MIGRATE_SEARCH_DOC = (
+    text(
+        "ALTER TABLE proven_models ADD COLUMN IF NOT EXISTS search_doc tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+        "setweight(to_tsvector('english', outcomes_text(target_outcomes)), 'C')"
+        ") STORED"
+    ),
+    text(
+        "CREATE INDEX IF NOT EXISTS ix_proven_models_search_gin "
+        "ON proven_models USING gin (search_doc)"
+    ),
+    text("DROP INDEX IF EXISTS ix_proven_models_name_trgm"),
+    text("DROP INDEX IF EXISTS ix_proven_models_desc_trgm"),
+)
+_SEED_PROVEN_MODELS = text("""
+    INSERT INTO proven_models (id, name, description, implementation_guide, evidence_base, themes, target_outcomes, created_at) VALUES
+    (
+        'd290f1ee-6c54-4b01-90e6-d701748f0851',
+        'Teaching at the Right Level (TaRL)',
+        'An evidence-based approach that groups children by learning level rather than age or grade, enabling targeted instruction for foundational skills.',
+        'Step 1: Conduct baseline assessments. Step 2: Group by ability. Step 3: Use structured activities. Step 4: Reassess regularly.',
+        'Rigorous RCTs by J-PAL shown 0.7 SD improvement. Scaled to millions in India via government partnerships. Aligned with NIPUN Bharat goals.',
+        ARRAY['FLN'],
+        ARRAY['Improved reading fluency', 'Number recognition', 'Basic arithmetic'],
+        NOW()
+    ),
+    (
+        'a1b2c3d4-e5f6-4a5b-8c9d-0e1f2a3b4c5d',
+        'Remedial Learning Camps',
+        'Intensive short-term learning camps focused on catching up children who are behind grade-level expectations. Aligned with NEP 2020 goals.',
+        'Step 1: Identify at-risk students. Step 2: Organize 30-45 day intensive camps. Step 3: Focus on FLN competencies per NIPUN Bharat.',
+        'Used by Pratham and state governments. Shows significant gains in foundational literacy as per ASER assessments.',
+        ARRAY['FLN', 'Life Skills'],
+        ARRAY['Grade-level reading per NIPUN 3', 'Math competency'],
+        NOW()
+    ),
+    (
+        'b2c3d4e5-f6a7-4b8c-9d0e-1f2a3b4c5d6e',
+        'Career Awareness Workshops',
+        'Structured workshops exposing students to diverse career paths, building agency and decision-making skills per NEP 2020.',
+        'Step 1: Map local career opportunities. Step 2: Invite professionals. Step 3: Conduct skill-building activities. Step 4: Goal-setting exercises.',
+        'Research shows improved career aspirations and self-efficacy. Particularly effective for first-generation learners.',
+        ARRAY['Career Readiness'],
+        ARRAY['Career awareness', 'Goal setting', 'Self-efficacy', 'Agency building'],
+        NOW()
+    ),
+    (
+        'c3d4e5f6-a7b8-4c9d-0e1f-2a3b4c5d6e7f',
+        'Peer Learning Circles',
+        'Student-led small group learning that promotes collaboration and deeper understanding through constructivist pedagogy.',
+        'Step 1: Train student facilitators. Step 2: Form groups of 4-6. Step 3: Assign structured prompts. Step 4: Rotate leadership.',
+        'Meta-analyses show 0.4-0.5 SD effects. Builds academic and social-emotional skills aligned with NCF 2023.',
+        ARRAY['FLN', 'Life Skills', 'STEM'],
+        ARRAY['Collaborative skills', 'Academic achievement', 'Leadership'],
+        NOW()
+    ),
+    (
+        'd4e5f6a7-b8c9-4d0e-1f2a-3b4c5d6e7f8d',
+        'Digital Literacy Integration',
+        'Structured approach to building digital skills alongside core academics, supporting NEP 2020 technology integration goals.',
+        'Step 1: Assess infrastructure. Step 2: Train teachers on ed-tech. Step 3: Integrate digital activities. Step 4: Monitor outcomes.',
+        'Growing evidence for blended learning. Critical for 21st-century skills and PM eVidya alignment.',
+        ARRAY['STEM', 'Career Readiness'],
+        ARRAY['Digital literacy', 'Self-directed learning', 'Tech skills'],
+        NOW()
+    )
+    ON CONFLICT (id) DO NOTHING;
+""")
+_SEED_BADGES = text("""
+    INSERT INTO badges (id, name, description, icon, step_number, xp_reward)
+    SELECT uuid_generate_v4(), n, d, i, s, x
+    FROM (VALUES
+        ('Problem Explorer', 'Defined your challenge statement clearly', '🔍', 1, 100),
+        ('Stakeholder Mapper', 'Identified key stakeholders for your program', '🤝', 2, 150),
+        ('Evidence Seeker', 'Selected proven models for your intervention', '📚', 3, 150),
+        ('Indicator Architect', 'Built measurable indicators for your outcomes', '📊', 4, 200),
+        ('Program Designer', 'Generated your complete program design document', '🏆', 5, 250)
+    ) AS v(n, d, i, s, x)
+    WHERE NOT EXISTS (SELECT 1 FROM badges WHERE name = v.n);
+""")
+
+
+async def _apply_migration(conn, label, statements):
+    """Run each migration statement in its own execute (asyncpg prepares
+    every statement, and Postgres rejects multi-command strings there)
+    and report failures instead of swallowing them — the statements are
+    IF [NOT] EXISTS idempotent, so an error here is a real problem."""
+    for stmt in statements:
+        try:
+            # SAVEPOINT per statement so a failure doesn't abort the
+            # outer seed transaction
+            async with conn.begin_nested():
+                await conn.execute(stmt)
+        except Exception as e:
+            print(f"⚠️  Migration '{label}' statement failed: {e}")
+
+
+async def seed():
+    """Initialize database - create tables and seed data if missing."""
+    # Import models here to register them with Base.metadata
+    from app import models  # noqa: F401
+    from app.database import Base
+
+    async with get_engine().begin() as conn:
+        # Serialize concurrent seeders (multi-worker deploys) behind one lock
+        await conn.execute(_LOCK_SEED)
+
+        # Enable pgvector (embeddings) and uuid-ossp (uuid_generate_v4 for
+        # the badge seed) up front.
+        for stmt in _CREATE_EXTENSIONS:
+            await conn.execute(stmt)
+
+        # Optional: pg_prewarm backs the startup index warm-up in RAGService
+        try:
+            await conn.execute(_CREATE_PREWARM_EXTENSION)
+        except Exception:
+            pass # Not available on this host — prewarm becomes a no-op
+
+        # Helper the proven_models.search_doc generated column depends on;
+        # must exist before create_all builds the table
+        await conn.execute(_CREATE_OUTCOMES_TEXT_FN)
+
+        # Create all tables defined in models
+        await conn.run_sync(Base.metadata.create_all)
+
+        # MIGRATION: Check if badges table has xp_reward column (fix for existing DBs)
+        try:
+            await conn.execute(_MIGRATE_BADGES_XP)
+        except Exception:
+            pass # Ignore if already exists or other minor issue
+
+        # MIGRATION: fp32 vector -> fp16 halfvec embeddings (fix for existing DBs)
+        try:
+            await conn.execute(_MIGRATE_EMBEDDING_HALFVEC)
+        except Exception:
+            pass # Ignore if already migrated
+
+        # MIGRATION: json -> jsonb root causes (fix for existing DBs)
+        try:
+            await conn.execute(_MIGRATE_ROOT_CAUSES_JSONB)
+        except Exception:
+            pass # Ignore if already migrated
+
+        # MIGRATION: cosine -> inner-product HNSW index (fix for existing DBs;
+        # embeddings are unit-norm so ranking is unchanged)
+        await _apply_migration(conn, "inner-product HNSW index", _MIGRATE_EMBEDDING_IP_INDEX)
+
+        # MIGRATION: tsvector search column + GIN for the keyword fallback
+        # (fix for existing DBs; also retires the trigram indexes it replaces)
+        await _apply_migration(conn, "search_doc tsvector", _MIGRATE_SEARCH_DOC)
+
+        # SEED DATA using ON CONFLICT to avoid duplication
+        # This handles both empty DBs and partial seeds (e.g. if previous seed failed halfway)
+
+        # Seed Proven Models
+        print("🌱 Seeding Proven Models (if missing)...")
+        await conn.execute(_SEED_PROVEN_MODELS)
+
+        # Seed Badges
+        print("🌱 Seeding Badges (if missing)...")
+
+        # Safe seed for Badges using NOT EXISTS to avoid duplicates
+        await conn.execute(_SEED_BADGES)
+        print("✅ Database seeding complete!")
+
+
+if __name__ == "__main__":
+    asyncio.run(seed())